@@ -0,0 +1,66 @@
+"""
+Модуль для чтения активной версии поискового индекса работающими процессами
+"""
+
+from typing import Optional
+from ..utils.config import load_config, resolve_project_path
+import json
+import logging
+import os
+import threading
+import time
+
+# Инициализация логгера
+logger = logging.getLogger(__name__)
+
+def get_registry_path() -> str:
+    """Путь к файлу реестра из конфигурации"""
+    return resolve_project_path(load_config()["index_registry"]["path"])
+
+# Кеш активной версии: реестр перечитывается, только если файл изменился
+_active_lock = threading.Lock()
+_active_state = {"path": None, "mtime": None, "checked_at": 0.0, "active": None, "manifest_hash": None}
+
+def read_active_state() -> dict:
+    """
+    Активная версия из реестра для работающих процессов
+
+    Файл реестра проверяется не чаще раза в poll_interval секунд, поэтому
+    переключение версии подхватывается без перезапуска бота.
+    """
+    config = load_config()["index_registry"]
+    path = get_registry_path()
+    now = time.monotonic()
+    with _active_lock:
+        if _active_state["path"] != path or now - _active_state["checked_at"] >= config["poll_interval"]:
+            _active_state["checked_at"] = now
+            try:
+                mtime = os.stat(path).st_mtime_ns
+            except FileNotFoundError:
+                mtime = None
+            if _active_state["path"] != path or mtime != _active_state["mtime"]:
+                data = {}
+                if mtime is not None:
+                    with open(path, "r", encoding="utf-8") as f:
+                        data = json.load(f)
+                active = data.get("active")
+                chunks_hash = data.get("versions", {}).get(active, {}).get("manifest_hash")
+                if active != _active_state["active"] and _active_state["path"] == path:
+                    logger.info(f"Активная версия индекса изменилась: {_active_state['active']} -> {active}")
+                _active_state.update(path=path, mtime=mtime, active=active, manifest_hash=chunks_hash)
+        return dict(_active_state)
+
+def get_active_index_id() -> Optional[str]:
+    """ID активного индекса (если реестра нет - SEARCH_INDEX_ID из окружения)"""
+    return read_active_state()["active"] or os.getenv("SEARCH_INDEX_ID") or None
+
+def get_active_index_version() -> Optional[str]:
+    """
+    Версия содержимого активного индекса для кешей: ID и хеш манифеста чанков
+
+    Меняется и при переключении индекса, и при дополнении активного индекса на месте.
+    """
+    state = read_active_state()
+    if state["active"] and state["manifest_hash"]:
+        return f"{state['active']}@{state['manifest_hash']}"
+    return get_active_index_id()
@@ -0,0 +1,172 @@
+"""
+Модуль кеша ответов ассистента по близости вопросов
+"""
+
+from typing import Optional
+from ..utils.config import load_config
+from .embeddings import get_embedder
+import logging
+import numpy as np
+import re
+import threading
+import time
+
+# Инициализация логгера
+logger = logging.getLogger(__name__)
+
+NUMBER_RE = re.compile(r"\d+(?:[.,/]\d+)*")
+# Слова и концы предложений (точка внутри кода направления концом не считается)
+TOKEN_RE = re.compile(r"[^\W\d_]+|[.!?](?=\s|$)")
+
+def key_facts(question: str) -> frozenset:
+    """
+    Числа и названия из вопроса: номера институтов, коды направлений, годы,
+    аббревиатуры и слова с заглавной буквы не в начале предложения
+
+    Вопросы с разными фактами не взаимозаменяемы, как бы близки ни были их векторы.
+    """
+    facts = set(NUMBER_RE.findall(question))
+    sentence_start = True
+    for token in TOKEN_RE.findall(question):
+        if token in ".!?":
+            sentence_start = True
+            continue
+        if (len(token) > 1 and token.isupper()) or (token[0].isupper() and not sentence_start):
+            facts.add(token.lower().replace("ё", "е"))
+        sentence_start = False
+    return frozenset(facts)
+
+class SemanticAnswerCache:
+    """
+    Кеш ответов по близости вопросов.
+    Вопрос переводится в вектор, ближайший ранее отвеченный вопрос с близостью
+    не ниже порога возвращает сохранённый ответ. Записи помечаются версией
+    поискового индекса и сбрасываются при её смене.
+
+    Близость настолько смысловая, насколько смысловой эмбеддер: с эмбеддером
+    yandex (по умолчанию) совпадают перефразировки, а hashing сравнивает
+    символьные триграммы и находит только почти дословные повторы вопроса.
+    Кеш общий для всех пользователей, поэтому в него попадают только вопросы,
+    заданные вне контекста диалога (см. AdmissionsAssistant.is_standalone).
+    Запись подходит, только если числа и названия в вопросах совпадают
+    (key_facts): "проходной балл в институт 3" и "... в институт 8" близки
+    по любому эмбеддеру, но ответы у них разные.
+    """
+
+    def __init__(self, embedder, threshold: float = 0.95, max_size: int = 2000, ttl_seconds: float = 86400):
+        self.embedder = embedder
+        self.threshold = threshold
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds
+        self.version = None
+        self.vectors = None
+        self.questions = []
+        self.facts = []
+        self.answers = []
+        self.created_at = []
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def reset(self, version: Optional[str]):
+        """Очистка записей и переход на новую версию индекса"""
+        if self.questions:
+            logger.info(f"Кеш ответов сброшен: версия индекса {self.version} -> {version}")
+        self.version = version
+        self.vectors = None
+        self.questions = []
+        self.facts = []
+        self.answers = []
+        self.created_at = []
+
+    def drop(self, count: int):
+        """Удаление первых (самых старых) записей"""
+        self.vectors = self.vectors[count:]
+        del self.questions[:count]
+        del self.facts[:count]
+        del self.answers[:count]
+        del self.created_at[:count]
+
+    def lookup(self, question: str, version: Optional[str]) -> Optional[dict]:
+        """Ответ на ближайший сохранённый вопрос или None"""
+        vector = self.embedder.embed_query(question)
+        facts = key_facts(question)
+        with self.lock:
+            if version != self.version:
+                self.reset(version)
+
+            # Записи добавляются по времени, поэтому устаревшие находятся в начале
+            now = time.time()
+            expired = 0
+            while expired < len(self.created_at) and now - self.created_at[expired] > self.ttl_seconds:
+                expired += 1
+            if expired:
+                self.drop(expired)
+
+            if not self.questions:
+                self.misses += 1
+                return None
+            similarities = self.vectors @ vector
+            best = None
+            for i in np.argsort(-similarities):
+                if similarities[i] < self.threshold:
+                    break
+                if self.facts[i] == facts:
+                    best = int(i)
+                    break
+            if best is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            return {
+                "answer": self.answers[best],
+                "question": self.questions[best],
+                "similarity": float(similarities[best]),
+            }
+
+    def store(self, question: str, answer: str, version: Optional[str]):
+        """Сохранение ответа на вопрос"""
+        # Тот же вызов, что и в lookup: у yandex векторы запросов и документов из разных моделей
+        vector = self.embedder.embed_query(question)[np.newaxis, :]
+        with self.lock:
+            if version != self.version:
+                self.reset(version)
+            self.vectors = vector if self.vectors is None else np.vstack([self.vectors, vector])
+            self.questions.append(question)
+            self.facts.append(key_facts(question))
+            self.answers.append(answer)
+            self.created_at.append(time.time())
+            if len(self.questions) > self.max_size:
+                self.drop(len(self.questions) - self.max_size)
+
+    def stats(self) -> dict:
+        """Счётчики попаданий и промахов"""
+        with self.lock:
+            total = self.hits + self.misses
+            return {
+                "size": len(self.questions),
+                "version": self.version,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / total if total else 0.0,
+            }
+
+_answer_cache = None
+_answer_cache_lock = threading.Lock()
+
+def get_answer_cache(sdk=None) -> Optional[SemanticAnswerCache]:
+    """Общий для процесса кеш ответов (None, если кеш отключён)"""
+    global _answer_cache
+    config = load_config()["answer_cache"]
+    if not config["enabled"]:
+        return None
+    if _answer_cache is None:
+        with _answer_cache_lock:
+            if _answer_cache is None:
+                _answer_cache = SemanticAnswerCache(
+                    get_embedder(sdk, config["embedder"]),
+                    threshold=config["threshold"],
+                    max_size=config["max_size"],
+                    ttl_seconds=config["ttl_seconds"],
+                )
+    return _answer_cache
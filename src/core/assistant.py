@@ -3,86 +3,483 @@
 """
 
 from ..utils.config import load_config
-from .sdk import initialize_sdk, create_thread, create_assistant, Handover
+from .sdk import (
+    initialize_sdk, create_assistant, get_index_id, get_index_version, Handover,
+    get_async_sdk, create_async_thread, get_async_assistant, run_search_tool, SEARCH_TOOL_NAME,
+)
+from .answer_cache import get_answer_cache
+from .faq import answer_faq
+from ..data.token_cache import get_token_cache
 from dotenv import load_dotenv
-import os
+from typing import Optional
+import asyncio
 import logging
-import json
+import queue
+import threading
+import time
+import weakref
 
 # Инициализация логгера
 logger = logging.getLogger(__name__)
 
 load_dotenv()
 
+# Фоновый цикл событий, в котором выполняются синхронные вызовы ассистента
+background_loop = None
+background_loop_lock = threading.Lock()
+
+def get_background_loop() -> asyncio.AbstractEventLoop:
+    """Общий для процесса цикл событий в отдельном потоке (запускается при первом обращении)"""
+    global background_loop
+    if background_loop is None:
+        with background_loop_lock:
+            if background_loop is None:
+                loop = asyncio.new_event_loop()
+                threading.Thread(target=loop.run_forever, name="assistant-loop", daemon=True).start()
+                background_loop = loop
+    return background_loop
+
+def run_sync(coro):
+    """Выполнение корутины в фоновом цикле с ожиданием результата в вызывающем потоке"""
+    return asyncio.run_coroutine_threadsafe(coro, get_background_loop()).result()
+
+def iterate_sync(async_iterable):
+    """
+    Обход асинхронного генератора из синхронного кода через фоновый цикл
+
+    Если вызывающий прекращает обход раньше, генератор отменяется.
+    """
+    items = queue.Queue()
+    done = object()
+
+    async def pump():
+        try:
+            async for item in async_iterable:
+                items.put(item)
+        finally:
+            items.put(done)
+
+    future = asyncio.run_coroutine_threadsafe(pump(), get_background_loop())
+    try:
+        while True:
+            item = items.get()
+            if item is done:
+                break
+            yield item
+    finally:
+        future.cancel()
+
+# Потоки, выведенные из работы и ожидающие пакетного удаления (по циклам событий,
+# так как объекты асинхронного SDK привязаны к своему циклу)
+retired_threads = weakref.WeakKeyDictionary()
+retired_threads_lock = threading.Lock()
+
+async def delete_threads(threads):
+    """Параллельное удаление пачки удалённых потоков"""
+    async def delete(thread):
+        try:
+            await thread.delete()
+        except Exception as e:
+            logger.error(f"Ошибка при удалении потока {getattr(thread, 'id', '?')}: {e}")
+
+    if threads:
+        await asyncio.gather(*(delete(thread) for thread in threads))
+        logger.info(f"Удалено потоков: {len(threads)}")
+
+async def retire_thread(thread, flush: bool = False):
+    """Постановка потока в очередь на удаление; очередь удаляется пачкой по заполнении"""
+    batch = []
+    with retired_threads_lock:
+        pending = retired_threads.setdefault(asyncio.get_running_loop(), [])
+        if thread is not None:
+            pending.append(thread)
+        if flush or len(pending) >= load_config()["assistant"]["thread_delete_batch"]:
+            batch = pending[:]
+            pending.clear()
+    await delete_threads(batch)
+
+# Блокировки сессий пользователей (по циклам событий, так как asyncio.Lock
+# привязан к своему циклу); обращения к ним идут только из потока цикла
+session_locks = weakref.WeakKeyDictionary()
+
+def get_session_lock(user_id) -> asyncio.Lock:
+    """Блокировка, по которой запросы одного пользователя выполняются по очереди"""
+    locks = session_locks.setdefault(asyncio.get_running_loop(), {})
+    if user_id not in locks:
+        locks[user_id] = asyncio.Lock()
+    return locks[user_id]
+
+def release_session_lock(user_id):
+    """Удаление блокировки сессии, если её никто не держит"""
+    locks = session_locks.get(asyncio.get_running_loop(), {})
+    lock = locks.get(user_id)
+    if lock is not None and not lock.locked():
+        del locks[user_id]
+
 class AdmissionsAssistant:
-    def __init__(self):
+    def __init__(self, pool=None, user_id=None):
+        """
+        Args:
+            pool: Общий пул ассистентов (AssistantPool). С пулом экземпляр хранит
+                только состояние пользователя, а удалённый ассистент и SDK общие.
+            user_id: Идентификатор пользователя; его запросы выполняются по очереди,
+                чтобы два быстрых сообщения не меняли поток диалога одновременно
+        """
         self.config = load_config()
-        self.sdk = initialize_sdk()
+        self.pool = pool
+        self.user_id = user_id if user_id is not None else id(self)
+        self.sdk = pool.sdk if pool else initialize_sdk()
         self.thread = None
+        self.thread_turns = 0
+        self.thread_tokens = 0
+        self.thread_broken = False
+        # Время последнего вопроса: контекст диалога учитывается отдельно от потока,
+        # так как ответы из FAQ и кеша в поток не пишутся, а поток периодически заменяется
+        self.last_turn_at = None
         self.assistant = None
+        self.index_version = None
         
     def start(self):
-        """Инициализация диалога с ассистентом"""
-        self.thread = create_thread(self.sdk)
-        self.assistant = create_assistant(self.sdk, self.thread)
+        """Инициализация диалога с ассистентом (поток создаётся при первом вопросе)"""
+        if self.pool is None:
+            self.index_version = get_index_id()
+            self.assistant = create_assistant(self.sdk, None)
         return "Ассистент готов к работе!"
+
+    def needs_new_thread(self, tokens: int, standalone: bool = False) -> bool:
+        """
+        Следующий вопрос (tokens - его оценка в токенах) пойдёт в новый поток
+
+        Новый диалог (standalone) всегда начинается с нового потока, чтобы ответ
+        не зависел от истории прежнего диалога и его можно было сохранить в кеш.
+        """
+        config = self.config["assistant"]
+        return (
+            self.thread is None
+            or standalone
+            or self.thread_broken
+            or config["thread_mode"] != "session"
+            or self.thread_turns >= config["max_thread_turns"]
+            or self.thread_tokens + tokens > config["max_thread_tokens"]
+        )
+
+    def is_standalone(self) -> bool:
+        """
+        Очередной вопрос задаётся вне контекста диалога
+
+        Только такие вопросы можно брать из общего кеша ответов и сохранять в
+        него: уточнение вроде "а сколько стоит?" зависит от предыдущих вопросов
+        пользователя, на какой бы путь (faq, cache, llm) они ни ушли. Диалог
+        считается новым, если пользователь ещё ничего не спрашивал или молчал
+        дольше ASSISTANT_CONTEXT_IDLE секунд.
+        """
+        if self.last_turn_at is None:
+            return True
+        return time.time() - self.last_turn_at > self.config["assistant"]["context_idle_seconds"]
+
+    def begin_turn(self) -> bool:
+        """Отметка очередного вопроса; возвращает, начинает ли он новый диалог"""
+        standalone = self.is_standalone()
+        self.last_turn_at = time.time()
+        return standalone
+
+    async def get_thread(self, question: str, standalone: bool = False):
+        """
+        Поток для очередного вопроса
+
+        В режиме session поток пользователя переиспользуется между вопросами, пока
+        не достигнуты лимиты числа ходов и токенов контекста, затем заменяется новым.
+        В режиме per_question каждый вопрос задаётся в новом потоке. Поток, в котором
+        запуск был прерван, тоже заменяется.
+        """
+        tokens = get_token_cache().estimate(question)
+        if self.needs_new_thread(tokens, standalone):
+            if self.thread is not None:
+                logger.info(f"Замена потока после {self.thread_turns} ходов (~{self.thread_tokens} токенов)")
+                await retire_thread(self.thread)
+            self.thread = None
+            self.thread = await create_async_thread(get_async_sdk())
+            self.thread_turns = 0
+            self.thread_tokens = 0
+            self.thread_broken = False
+        self.thread_turns += 1
+        self.thread_tokens += tokens
+        return self.thread
+
+    def get_remote_assistant(self):
+        """Удалённый ассистент для запроса: из пула или собственный"""
+        if self.pool is not None:
+            return self.pool.acquire()
+        self.refresh_if_index_changed()
+        return self.assistant
+
+    def refresh_if_index_changed(self):
+        """Пересоздание ассистента, если активная версия индекса переключилась"""
+        version = get_index_id()
+        if self.assistant is None or version == self.index_version:
+            return
+        logger.info(f"Версия индекса изменилась ({self.index_version} -> {version}), пересоздаём ассистента")
+        old_assistant = self.assistant
+        self.index_version = version
+        self.assistant = create_assistant(self.sdk, None)
+        try:
+            old_assistant.delete()
+        except Exception as e:
+            logger.error(f"Ошибка при удалении старого ассистента: {e}")
+
+    def answer_locally(self, question: str, start_time: float, standalone: bool) -> Optional[str]:
+        """Ответ без обращения к модели: из типовых вопросов или из кеша ответов (только для нового диалога)"""
+        # Типовой вопрос из таблиц документов - отвечаем без обращения к модели
+        faq = answer_faq(question)
+        if faq:
+            logger.info(f"Путь ответа: faq ({time.time() - start_time:.3f} сек, уверенность {faq['confidence']:.2f}, "
+                        f"{faq['source']}, строка {faq['row']}): {faq['question']}")
+            return faq["answer"]
+
+        # Похожий вопрос уже задавали - отвечаем из кеша без обращения к модели
+        answer_cache = get_answer_cache(self.sdk)
+        if answer_cache is not None and standalone:
+            cached = answer_cache.lookup(question, get_index_version())
+            if cached:
+                logger.info(f"Путь ответа: cache ({time.time() - start_time:.3f} сек, "
+                            f"близость {cached['similarity']:.3f}): {cached['question']}")
+                return cached["answer"]
+        return None
+
+    def handle_result(self, result, question: str, version: str, start_time: float, cacheable: bool):
+        """
+        Разбор результата запуска: вызов функции или текстовый ответ
+
+        Текстовый ответ сохраняется в общий кеш, только если cacheable - вопрос
+        начинал новый диалог (см. is_standalone).
+        """
+        # Логируем полученный результат
+        logger.info(f"Получен ответ от ассистента: {result}")
         
-    def ask(self, question: str) -> str:
-        """Задать вопрос ассистенту"""
+        # Проверяем, является ли ответ вызовом функции
+        if hasattr(result, 'tool_calls') and result.tool_calls:
+            logger.info(f"Получен вызов функции: {result.tool_calls}")
+            try:
+                # Получаем первый вызов функции
+                tool_call = result.tool_calls[0]
+                if tool_call.function.name == 'handover_to_operator':
+                    # Создаем экземпляр Handover и вызываем process
+                    handover = Handover(reason=tool_call.function.arguments.get('reason', 'не указана'))
+                    return {
+                        'function_call': {
+                            'name': 'handover_to_operator',
+                            'arguments': tool_call.function.arguments
+                        }
+                    }
+                else:
+                    logger.warning(f"Неизвестный вызов функции: {tool_call.function.name}")
+                    return "Извините, произошла ошибка при обработке запроса."
+            except Exception as e:
+                logger.error(f"Ошибка при обработке вызова функции: {e}")
+                return "Произошла ошибка при обработке запроса. Попробуйте позже."
+        
+        # Если это обычный ответ
+        if hasattr(result, 'text') and result.text:
+            logger.info(f"Получен текстовый ответ: {result.text}")
+            logger.info(f"Путь ответа: llm ({time.time() - start_time:.3f} сек)")
+            self.thread_tokens += get_token_cache().estimate(result.text)
+            answer_cache = get_answer_cache(self.sdk)
+            if answer_cache is not None and cacheable:
+                answer_cache.store(question, result.text, version)
+            return result.text
+        else:
+            logger.warning("Получен пустой ответ от ассистента")
+            return "Извините, я не смог обработать ваш запрос. Попробуйте переформулировать вопрос."
+
+    @staticmethod
+    def search_calls(result) -> list:
+        """Вызовы функции поиска в результате запуска (пусто, если есть и другие вызовы)"""
+        tool_calls = list(getattr(result, "tool_calls", None) or [])
+        if not tool_calls or any(call.function.name != SEARCH_TOOL_NAME for call in tool_calls):
+            return []
+        return tool_calls
+
+    async def submit_search_results(self, run, calls):
+        """Поиск по вызовам ассистента и передача результатов в запуск"""
+        contents = await asyncio.gather(*(
+            asyncio.to_thread(run_search_tool, self.sdk, call.function.arguments or {}) for call in calls
+        ))
+        # Результаты поиска остаются в контексте потока
+        self.thread_tokens += sum(get_token_cache().estimate(content) for content in contents)
+        await run.submit_tool_results([{"name": SEARCH_TOOL_NAME, "content": content} for content in contents])
+
+    async def cancel_run(self, run):
+        """Отмена запуска в облаке, чтобы он не продолжал расходовать токены"""
+        try:
+            await asyncio.wait_for(run.cancel(), timeout=5)
+            logger.info(f"Запуск {getattr(run, 'id', '?')} отменён")
+        except Exception as e:
+            logger.warning(f"Не удалось отменить запуск {getattr(run, 'id', '?')}: {e}")
+
+    async def ask_remote(self, question: str, start_time: float, standalone: bool):
+        """Вопрос модели через асинхронный клиент"""
+        version = get_index_version()
+        remote = await asyncio.to_thread(self.get_remote_assistant)
+        assistant = await get_async_assistant(get_async_sdk(), remote.id)
+
+        # Поток пользователя переиспользуется, пока не достигнут лимит контекста
+        thread = await self.get_thread(question, standalone)
+
+        # Задаем вопрос
+        logger.info(f"Отправка вопроса ассистенту: {question}")
+        run = None
+        try:
+            await thread.write(question)
+            run = await assistant.run(thread)
+            result = await run.wait()
+            # Поиск выполняется в процессе бота, пока модель его запрашивает
+            for _ in range(self.config["assistant"]["max_tool_rounds"]):
+                calls = self.search_calls(result)
+                if not calls:
+                    break
+                await self.submit_search_results(run, calls)
+                result = await run.wait()
+        except BaseException:
+            # Ход в потоке остался без ответа - следующий вопрос пойдёт в новый поток
+            self.thread_broken = True
+            if run is not None:
+                await self.cancel_run(run)
+            raise
+        return await asyncio.to_thread(self.handle_result, result, question, version, start_time, standalone)
+
+    async def stream_remote(self, question: str, start_time: float, standalone: bool):
+        """Вопрос модели с потоковой выдачей: накопленный текст, затем итоговый ответ"""
+        version = get_index_version()
+        remote = await asyncio.to_thread(self.get_remote_assistant)
+        assistant = await get_async_assistant(get_async_sdk(), remote.id)
+        thread = await self.get_thread(question, standalone)
+
+        logger.info(f"Отправка вопроса ассистенту (потоковый режим): {question}")
+        run = None
+        last_event = None
+        text = ""
         try:
-            # Создаем новый поток для каждого запроса
-            logger.info("[DEBUG] Создание нового потока для запроса")
-            self.thread = create_thread(self.sdk)
-            
-            # Задаем вопрос
-            logger.info(f"Отправка вопроса ассистенту: {question}")
-            self.thread.write(question)
-            run = self.assistant.run(self.thread)
-            result = run.wait()
-            
-            # Логируем полученный результат
-            logger.info(f"Получен ответ от ассистента: {result}")
-            
-            # Проверяем, является ли ответ вызовом функции
-            if hasattr(result, 'tool_calls') and result.tool_calls:
-                logger.info(f"Получен вызов функции: {result.tool_calls}")
+            await thread.write(question)
+            run = await assistant.run_stream(thread)
+            events = run
+            seen = 0
+            rounds = 0
+            while True:
+                async for event in events:
+                    seen += 1
+                    last_event = event
+                    chunk = getattr(event, "text", None)
+                    if not chunk:
+                        continue
+                    # События содержат накопленный текст; приращение дописываем к уже полученному
+                    if not text:
+                        logger.info(f"Первый фрагмент ответа через {time.time() - start_time:.3f} сек")
+                    updated = chunk if chunk.startswith(text) else text + chunk
+                    if updated != text:
+                        text = updated
+                        yield text
+                # Запуск остановился на вызове поиска - выполняем его и слушаем продолжение
+                calls = self.search_calls(last_event)
+                if not calls or rounds >= self.config["assistant"]["max_tool_rounds"]:
+                    break
+                rounds += 1
+                await self.submit_search_results(run, calls)
+                events = run.listen(events_start_idx=seen)
+        except BaseException:
+            # Ход в потоке остался без ответа - следующий вопрос пойдёт в новый поток
+            self.thread_broken = True
+            if run is not None:
+                await self.cancel_run(run)
+            raise
+        yield await asyncio.to_thread(self.handle_result, last_event, question, version, start_time, standalone)
+
+    async def ask_stream_async(self, question: str, timeout: Optional[float] = None):
+        """
+        Задать вопрос с потоковой выдачей ответа
+
+        Генератор выдаёт накопленный текст ответа по мере генерации, последним
+        элементом - итоговый ответ в том же виде, что возвращает ask_async
+        (строка или вызов функции). Ответы из типовых вопросов и кеша выдаются
+        одним элементом. Таймаут и отмена обрабатываются так же, как в ask_async.
+        """
+        start_time = time.time()
+        timeout = timeout or self.config["assistant"]["request_timeout"]
+        loop = asyncio.get_running_loop()
+        try:
+            async with get_session_lock(self.user_id):
+                standalone = self.begin_turn()
+                answer = await asyncio.to_thread(self.answer_locally, question, start_time, standalone)
+                if answer is not None:
+                    yield answer
+                    return
+                # Как и в ask_async, таймаут отсчитывается от запроса к модели,
+                # а не от ожидания предыдущего вопроса того же пользователя
+                deadline = loop.time() + timeout
+                stream = self.stream_remote(question, start_time, standalone)
                 try:
-                    # Получаем первый вызов функции
-                    tool_call = result.tool_calls[0]
-                    if tool_call.function.name == 'handover_to_operator':
-                        # Создаем экземпляр Handover и вызываем process
-                        handover = Handover(reason=tool_call.function.arguments.get('reason', 'не указана'))
-                        return {
-                            'function_call': {
-                                'name': 'handover_to_operator',
-                                'arguments': tool_call.function.arguments
-                            }
-                        }
-                    else:
-                        logger.warning(f"Неизвестный вызов функции: {tool_call.function.name}")
-                        return "Извините, произошла ошибка при обработке запроса."
-                except Exception as e:
-                    logger.error(f"Ошибка при обработке вызова функции: {e}")
-                    return "Произошла ошибка при обработке запроса. Попробуйте позже."
-            
-            # Если это обычный ответ
-            if hasattr(result, 'text') and result.text:
-                logger.info(f"Получен текстовый ответ: {result.text}")
-                return result.text
-            else:
-                logger.warning("Получен пустой ответ от ассистента")
-                return "Извините, я не смог обработать ваш запрос. Попробуйте переформулировать вопрос."
-                
+                    while True:
+                        try:
+                            item = await asyncio.wait_for(stream.__anext__(), deadline - loop.time())
+                        except StopAsyncIteration:
+                            break
+                        yield item
+                finally:
+                    await stream.aclose()
+        except asyncio.TimeoutError:
+            logger.error(f"Ассистент не ответил за {timeout} сек: {question}")
+            yield "Ответ занимает слишком много времени. Попробуйте задать вопрос позже."
+        except Exception as e:
+            logger.error(f"Ошибка при обработке запроса: {e}")
+            yield "Произошла ошибка при обработке вашего запроса. Попробуйте позже."
+
+    def ask_stream(self, question: str):
+        """Потоковая выдача ответа (синхронная обёртка над ask_stream_async)"""
+        return iterate_sync(self.ask_stream_async(question))
+
+    async def ask_async(self, question: str, timeout: Optional[float] = None):
+        """
+        Задать вопрос ассистенту без блокировки цикла событий
+
+        Один цикл событий обслуживает любое число одновременных диалогов,
+        а вопросы одного пользователя ждут друг друга (get_session_lock).
+        Если модель не ответила за timeout секунд (по умолчанию ASSISTANT_TIMEOUT),
+        запуск отменяется в облаке. При отмене самой корутины запуск тоже
+        отменяется, а CancelledError пробрасывается вызывающему.
+        """
+        start_time = time.time()
+        timeout = timeout or self.config["assistant"]["request_timeout"]
+        try:
+            async with get_session_lock(self.user_id):
+                standalone = self.begin_turn()
+                answer = await asyncio.to_thread(self.answer_locally, question, start_time, standalone)
+                if answer is not None:
+                    return answer
+                return await asyncio.wait_for(self.ask_remote(question, start_time, standalone), timeout)
+        except asyncio.TimeoutError:
+            logger.error(f"Ассистент не ответил за {timeout} сек: {question}")
+            return "Ответ занимает слишком много времени. Попробуйте задать вопрос позже."
         except Exception as e:
             logger.error(f"Ошибка при обработке запроса: {e}")
             return "Произошла ошибка при обработке вашего запроса. Попробуйте позже."
+
+    def ask(self, question: str) -> str:
+        """Задать вопрос ассистенту (синхронная обёртка над ask_async)"""
+        return run_sync(self.ask_async(question))
+
+    async def cleanup_async(self):
+        """Очистка ресурсов"""
+        # Текущий поток удаляется вместе с накопившимися в очереди
+        async with get_session_lock(self.user_id):
+            thread, self.thread = self.thread, None
+        release_session_lock(self.user_id)
+        await retire_thread(thread, flush=True)
+        # Ассистент из пула общий и удаляется только вместе с пулом
+        if self.assistant and self.pool is None:
+            await asyncio.to_thread(self.assistant.delete)
         
     def cleanup(self):
-        """Очистка ресурсов"""
-        if self.thread:
-            self.thread.delete()
-        if self.assistant:
-            self.assistant.delete()
+        """Очистка ресурсов (синхронная обёртка над cleanup_async)"""
+        run_sync(self.cleanup_async())
 
 if __name__ == "__main__":
     assistant = AdmissionsAssistant()
@@ -0,0 +1,159 @@
+"""
+Модуль общего пула ассистентов для всех пользователей бота
+"""
+
+from typing import List, Optional
+from ..utils.config import load_config
+from ..utils.sdk_init import initialize_sdk
+from .sdk import create_assistant, get_index_id
+import itertools
+import logging
+import threading
+import time
+
+# Инициализация логгера
+logger = logging.getLogger(__name__)
+
+class PooledAssistant:
+    """Удалённый ассистент с временем создания и версией индекса"""
+
+    def __init__(self, assistant, index_version: str):
+        self.assistant = assistant
+        self.index_version = index_version
+        self.created_at = time.time()
+        self.last_used = self.created_at
+
+class AssistantPool:
+    """
+    Пул удалённых ассистентов, общий для всех пользователей.
+
+    Определение ассистента (модель, инструкция, инструменты) одинаково для всех,
+    поэтому он создаётся один раз (или несколько для параллельности) и
+    переиспользуется. Ассистент пересоздаётся заранее, до истечения TTL
+    в облаке, и при переключении версии поискового индекса. Замена создаётся
+    в фоне, а запросы тем временем обслуживает прежний ассистент; общая
+    блокировка держится только на время подмены, поэтому создание ассистента
+    (несколько секунд) не задерживает остальных пользователей. Заменённые
+    ассистенты удаляются после паузы, чтобы не оборвать выполняющиеся запросы.
+    """
+
+    def __init__(self, sdk=None, size: Optional[int] = None):
+        config = load_config()["assistant"]
+        self.sdk = sdk or initialize_sdk()
+        self.size = size or config["pool_size"]
+        self.ttl_seconds = config["ttl_days"] * 86400
+        self.refresh_before = config["refresh_before_seconds"]
+        self.retire_grace = config["retire_grace_seconds"]
+        self.lock = threading.Lock()
+        self.slot_locks = [threading.Lock() for _ in range(self.size)]
+        self.slots: List[Optional[PooledAssistant]] = [None] * self.size
+        self.refreshing = set()
+        self.retired: List[tuple] = []
+        self.counter = itertools.count()
+
+    def create(self) -> PooledAssistant:
+        """Создание удалённого ассистента"""
+        start_time = time.time()
+        version = get_index_id()
+        assistant = create_assistant(self.sdk, None)
+        logger.info(f"Ассистент пула создан за {time.time() - start_time:.2f} сек (индекс {version or 'нет'})")
+        return PooledAssistant(assistant, version)
+
+    def is_expired(self, pooled: PooledAssistant) -> bool:
+        """Ассистент уже удалён облаком по TTL (политика since_last_active)"""
+        return time.time() > pooled.last_used + self.ttl_seconds
+
+    def is_stale(self, pooled: PooledAssistant) -> bool:
+        """Ассистент скоро истечёт в облаке или создан для старой версии индекса"""
+        # Политика since_last_active: TTL отсчитывается от последнего использования
+        expires_at = pooled.last_used + self.ttl_seconds
+        return time.time() > expires_at - self.refresh_before or pooled.index_version != get_index_id()
+
+    def replace(self, slot: int) -> PooledAssistant:
+        """Создание ассистента для слота вне общей блокировки и подмена под ней"""
+        try:
+            pooled = self.create()
+        finally:
+            with self.lock:
+                self.refreshing.discard(slot)
+        with self.lock:
+            old = self.slots[slot]
+            if old is not None:
+                logger.info(f"Ассистент пула в слоте {slot} заменён")
+                self.retired.append((time.time(), old.assistant))
+            self.slots[slot] = pooled
+        self.delete_retired()
+        return pooled
+
+    def refresh_in_background(self, slot: int):
+        """Фоновая замена ассистента слота; ошибка оставляет прежнего ассистента"""
+        try:
+            self.replace(slot)
+        except Exception as e:
+            logger.error(f"Ошибка при обновлении ассистента пула в слоте {slot}: {e}")
+
+    def acquire(self):
+        """Ассистент для очередного запроса (слоты пула выдаются по кругу)"""
+        slot = next(self.counter) % self.size
+        with self.lock:
+            pooled = self.slots[slot]
+            if pooled is not None and not self.is_expired(pooled):
+                if self.is_stale(pooled) and slot not in self.refreshing:
+                    self.refreshing.add(slot)
+                    threading.Thread(target=self.refresh_in_background, args=(slot,), daemon=True).start()
+                pooled.last_used = time.time()
+                return pooled.assistant
+
+        # Слот пуст или ассистент уже истёк: ждут только запросы этого слота
+        with self.slot_locks[slot]:
+            with self.lock:
+                pooled = self.slots[slot]
+            if pooled is None or self.is_expired(pooled):
+                pooled = self.replace(slot)
+            pooled.last_used = time.time()
+            return pooled.assistant
+
+    def warm_up(self):
+        """Создание всех ассистентов пула заранее"""
+        for _ in range(self.size):
+            self.acquire()
+
+    def delete_retired(self, force: bool = False):
+        """Удаление заменённых ассистентов, по которым уже не идут запросы"""
+        now = time.time()
+        due = []
+        with self.lock:
+            keep = []
+            for retired_at, assistant in self.retired:
+                if force or now - retired_at >= self.retire_grace:
+                    due.append(assistant)
+                else:
+                    keep.append((retired_at, assistant))
+            self.retired = keep
+        # Удаление - обращения к облаку, поэтому выполняется вне блокировки
+        for assistant in due:
+            try:
+                assistant.delete()
+            except Exception as e:
+                logger.error(f"Ошибка при удалении ассистента: {e}")
+
+    def shutdown(self):
+        """Удаление всех ассистентов пула"""
+        with self.lock:
+            for pooled in self.slots:
+                if pooled is not None:
+                    self.retired.append((0.0, pooled.assistant))
+            self.slots = [None] * self.size
+        self.delete_retired(force=True)
+
+_assistant_pool = None
+_assistant_pool_lock = threading.Lock()
+
+def get_assistant_pool() -> AssistantPool:
+    """Общий для процесса пул ассистентов"""
+    global _assistant_pool
+    if _assistant_pool is None:
+        with _assistant_pool_lock:
+            if _assistant_pool is None:
+                _assistant_pool = AssistantPool()
+    return _assistant_pool
@@ -0,0 +1,76 @@
+"""
+Модуль для получения векторных представлений текстов
+"""
+
+from typing import List, Optional
+from ..utils.config import load_config
+import numpy as np
+import re
+import zlib
+
+WORD_RE = re.compile(r"\w+")
+
+class HashingEmbedder:
+    """
+    Локальные векторы без обращения к облаку: символьные триграммы слов
+    хешируются в вектор фиксированной размерности (hashing trick) и нормируются.
+    Подходит для поиска по близкому написанию и опечаткам, работает за миллисекунды.
+    """
+
+    def __init__(self, dim: int = 512):
+        self.dim = dim
+        self.name = f"hashing-{dim}"
+
+    def embed(self, text: str) -> np.ndarray:
+        """Вектор одного текста"""
+        vector = np.zeros(self.dim, dtype=np.float32)
+        for word in WORD_RE.findall(text.lower().replace("ё", "е")):
+            word = f"<{word}>"
+            for i in range(max(len(word) - 2, 1)):
+                h = zlib.crc32(word[i:i + 3].encode())
+                # Знак из старшего бита снижает влияние коллизий
+                vector[h % self.dim] += 1.0 if h & 0x80000000 else -1.0
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    def embed_documents(self, texts: List[str]) -> np.ndarray:
+        """Матрица векторов документов"""
+        return np.vstack([self.embed(text) for text in texts]) if texts else np.zeros((0, self.dim), np.float32)
+
+    def embed_query(self, text: str) -> np.ndarray:
+        """Вектор запроса"""
+        return self.embed(text)
+
+class YandexEmbedder:
+    """Векторы моделей text-search-doc / text-search-query из Yandex Cloud"""
+
+    name = "yandex"
+
+    def __init__(self, sdk):
+        self.doc_model = sdk.models.text_embeddings("doc")
+        self.query_model = sdk.models.text_embeddings("query")
+
+    @staticmethod
+    def normalize(vector: np.ndarray) -> np.ndarray:
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    def embed_documents(self, texts: List[str]) -> np.ndarray:
+        """Матрица векторов документов"""
+        return np.vstack([
+            self.normalize(np.asarray(self.doc_model.run(text), dtype=np.float32)) for text in texts
+        ])
+
+    def embed_query(self, text: str) -> np.ndarray:
+        """Вектор запроса (один вызов облака)"""
+        return self.normalize(np.asarray(self.query_model.run(text), dtype=np.float32))
+
+def get_embedder(sdk=None, name: Optional[str] = None):
+    """Создание эмбеддера по конфигурации: hashing (локальный) или yandex"""
+    config = load_config()["local_search"]
+    name = name or config["embedder"]
+    if name == "yandex":
+        if sdk is None:
+            raise ValueError("Для эмбеддера yandex требуется SDK")
+        return YandexEmbedder(sdk)
+    return HashingEmbedder(config["dim"])
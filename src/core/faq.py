@@ -0,0 +1,145 @@
+"""
+Модуль быстрых ответов на типовые вопросы из таблиц официальных документов
+"""
+
+from dataclasses import dataclass
+from glob import glob
+from typing import Dict, List, Optional, Set
+from ..utils.config import load_config, resolve_project_path
+from ..data.parser import iter_docs, clean_text
+from .query_normalizer import tokenize, stem, prepare_query
+import logging
+import math
+import os
+import threading
+import time
+
+# Инициализация логгера
+logger = logging.getLogger(__name__)
+
+# Служебные слова не учитываются при сопоставлении вопросов
+STOP_WORDS = {
+    "а", "в", "во", "и", "или", "к", "ко", "на", "не", "ли", "о", "об", "от", "по", "с", "со", "у", "за",
+    "для", "до", "из", "при", "же", "бы", "то", "это", "как", "какой", "какая", "какие", "каких", "что",
+    "кто", "где", "когда", "можно", "мне", "я", "мы", "вы", "есть", "нужно", "надо", "ваш", "вас",
+    "подскажите", "скажите", "пожалуйста", "здравствуйте", "добрый", "день",
+}
+
+def faq_terms(text: str) -> Set[str]:
+    """Основы значимых слов текста"""
+    return {stem(token) for token in tokenize(text) if token not in STOP_WORDS}
+
+@dataclass(frozen=True)
+class FaqEntry:
+    """Вопрос и ответ из таблицы документа"""
+    source: str
+    title: str
+    row: int
+    question: str
+    answer: str
+    terms: frozenset
+    keywords: frozenset
+
+class FaqIndex:
+    """
+    Инвертированный индекс по вопросам и ключевым словам таблиц документов.
+    Уверенность совпадения - взвешенная по IDF F-мера: доля термов запроса,
+    найденных в вопросе или ключевых словах, и доля термов вопроса, найденных в запросе.
+    """
+
+    def __init__(self, entries: List[FaqEntry]):
+        self.entries = entries
+        self.postings: Dict[str, List[int]] = {}
+        for entry_id, entry in enumerate(entries):
+            for term in entry.terms | entry.keywords:
+                self.postings.setdefault(term, []).append(entry_id)
+        self.idf = {
+            term: math.log(1 + len(entries) / len(ids)) for term, ids in self.postings.items()
+        }
+
+    @classmethod
+    def from_files(cls, files: List[str]) -> "FaqIndex":
+        """Построение индекса по таблицам документов"""
+        entries = []
+        for filename in files:
+            source = os.path.relpath(filename, resolve_project_path("")).replace(os.sep, "/")
+            with open(filename, "r", encoding="utf-8") as f:
+                for record in iter_docs(f):
+                    question = record.question.replace("**", "").strip()
+                    entries.append(FaqEntry(
+                        source=source,
+                        title=record.title,
+                        row=record.row,
+                        question=question,
+                        answer=clean_text(record.answer),
+                        terms=frozenset(faq_terms(question)),
+                        keywords=frozenset(faq_terms(record.keywords)),
+                    ))
+        return cls(entries)
+
+    def weight(self, terms: Set[str]) -> float:
+        """Суммарный вес термов (неизвестные корпусу термы получают максимальный вес)"""
+        default = math.log(1 + len(self.entries))
+        return sum(self.idf.get(term, default) for term in terms)
+
+    def score(self, query_terms: Set[str], entry: FaqEntry) -> float:
+        """Уверенность совпадения запроса с вопросом от 0 до 1"""
+        covered = self.weight(query_terms & (entry.terms | entry.keywords)) / self.weight(query_terms)
+        matched = self.weight(entry.terms & query_terms) / max(self.weight(entry.terms), 1e-9)
+        if not covered or not matched:
+            return 0.0
+        return 2 * covered * matched / (covered + matched)
+
+    def match(self, query: str) -> List[tuple]:
+        """Кандидаты (уверенность, запись), лучшие первыми"""
+        query_terms = faq_terms(query)
+        if not query_terms:
+            return []
+        candidates = {entry_id for term in query_terms for entry_id in self.postings.get(term, [])}
+        scored = [(self.score(query_terms, self.entries[entry_id]), self.entries[entry_id]) for entry_id in candidates]
+        return sorted(scored, key=lambda item: -item[0])
+
+    def answer(self, query: str, threshold: float = 0.75, margin: float = 0.1) -> Optional[dict]:
+        """
+        Ответ на вопрос, если он уверенно совпадает с одной записью FAQ
+
+        Запись должна набрать не меньше threshold и опережать следующую хотя бы на margin,
+        иначе вопрос передаётся модели.
+        """
+        matches = self.match(query)
+        if not matches:
+            return None
+        best_score, best = matches[0]
+        # Один и тот же вопрос может повторяться в разных документах - это не конкурент
+        second_score = next((score for score, entry in matches[1:] if entry.terms != best.terms), 0.0)
+        if best_score < threshold or best_score - second_score < margin:
+            return None
+        return {
+            "answer": f"{best.answer}\n\nИсточник: {best.title}",
+            "question": best.question,
+            "confidence": best_score,
+            "source": best.source,
+            "row": best.row,
+        }
+
+_faq_index = None
+_faq_index_lock = threading.Lock()
+
+def get_faq_index() -> FaqIndex:
+    """Общий для процесса индекс FAQ (строится при первом обращении)"""
+    global _faq_index
+    if _faq_index is None:
+        with _faq_index_lock:
+            if _faq_index is None:
+                start_time = time.time()
+                files = sorted(glob(os.path.join(resolve_project_path(load_config()["data_dir"]), "docs", "*.md")))
+                _faq_index = FaqIndex.from_files(files)
+                logger.info(f"Индекс FAQ построен: {len(_faq_index.entries)} вопросов за {time.time() - start_time:.2f} сек")
+    return _faq_index
+
+def answer_faq(question: str) -> Optional[dict]:
+    """Быстрый ответ из FAQ или None, если уверенного совпадения нет"""
+    config = load_config()["faq"]
+    if not config["enabled"]:
+        return None
+    return get_faq_index().answer(prepare_query(question, expand=False), config["threshold"], config["margin"])
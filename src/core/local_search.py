@@ -0,0 +1,209 @@
+"""
+Модуль локального гибридного поиска (BM25 + векторы) по базе знаний
+"""
+
+from typing import Dict, List, Optional
+from ..utils.config import load_config
+from .embeddings import get_embedder
+from .query_normalizer import stem_tokens
+from ..data.embedding_store import EmbeddingStore, corpus_version, current_build
+import logging
+import numpy as np
+import threading
+import time
+
+# Инициализация логгера
+logger = logging.getLogger(__name__)
+
+class BM25Index:
+    """Инвертированный индекс BM25 с предвычисленными весами термов"""
+
+    def __init__(self, documents: List[List[str]], k1: float = 1.5, b: float = 0.75):
+        self.size = len(documents)
+        lengths = np.array([len(tokens) for tokens in documents], dtype=np.float32)
+        avg_length = lengths.mean() if self.size else 1.0
+
+        frequencies: Dict[str, Dict[int, int]] = {}
+        for doc_id, tokens in enumerate(documents):
+            for token in tokens:
+                postings = frequencies.setdefault(token, {})
+                postings[doc_id] = postings.get(doc_id, 0) + 1
+
+        # Для каждого терма храним ID документов и готовый вклад в оценку
+        self.postings: Dict[str, tuple] = {}
+        for token, postings in frequencies.items():
+            doc_ids = np.fromiter(postings.keys(), dtype=np.int32)
+            tf = np.fromiter(postings.values(), dtype=np.float32)
+            idf = np.log(1 + (self.size - len(doc_ids) + 0.5) / (len(doc_ids) + 0.5))
+            norm = tf + k1 * (1 - b + b * lengths[doc_ids] / avg_length)
+            self.postings[token] = (doc_ids, (idf * tf * (k1 + 1) / norm).astype(np.float32))
+
+    def scores(self, tokens: List[str]) -> np.ndarray:
+        """Оценки BM25 всех документов для запроса"""
+        scores = np.zeros(self.size, dtype=np.float32)
+        for token in set(tokens):
+            if token in self.postings:
+                doc_ids, weights = self.postings[token]
+                scores[doc_ids] += weights
+        return scores
+
+class LocalSearchIndex:
+    """
+    Локальный гибридный индекс: BM25 и косинусная близость векторов,
+    результаты объединяются через Reciprocal Rank Fusion, как в облачном индексе.
+
+    Оценка RRF зависит только от позиций в списках, поэтому порог score_threshold,
+    подобранный для облачных оценок, здесь не применяется: отсекает результаты
+    собственный порог local_search.score_threshold (LOCAL_SCORE_THRESHOLD).
+    """
+
+    def __init__(self, chunks: List[dict], embedder, vectors: Optional[np.ndarray] = None):
+        config = load_config()["local_search"]
+        self.chunks = chunks
+        self.embedder = embedder
+        self.rrf_k = config["rrf_k"]
+        self.score_threshold = config["score_threshold"]
+        # Масштаб бонусов переранжирования (см. reranker.rerank)
+        self.score_scale = config["rerank_scale"]
+        self.bm25 = BM25Index([stem_tokens(chunk["text"]) for chunk in chunks], config["bm25_k1"], config["bm25_b"])
+        self.vectors = vectors if vectors is not None else embedder.embed_documents([chunk["text"] for chunk in chunks])
+        # Версия индекса меняется при изменении содержимого чанков
+        self.version = f"local-{corpus_version(chunks)}"
+
+    def rank(self, scores: np.ndarray, depth: int) -> np.ndarray:
+        """ID документов с положительной оценкой, лучшие первыми (не более depth)"""
+        depth = min(depth, len(scores))
+        top = np.argpartition(-scores, depth - 1)[:depth] if depth else np.array([], dtype=np.int64)
+        top = top[np.argsort(-scores[top])]
+        return top[scores[top] > 0]
+
+    def fuse(self, bm25_scores: np.ndarray, vector_scores: np.ndarray, limit: int) -> List[dict]:
+        """Объединение двух ранжирований через RRF"""
+        depth = max(limit * 4, 50)
+        fused: Dict[int, float] = {}
+        for ranking in (self.rank(bm25_scores, depth), self.rank(vector_scores, depth)):
+            for position, doc_id in enumerate(ranking):
+                fused[int(doc_id)] = fused.get(int(doc_id), 0.0) + 1.0 / (self.rrf_k + position + 1)
+
+        # Нормируем так, чтобы документ, первый в обоих списках, получал 1.0
+        best = 2.0 / (self.rrf_k + 1)
+        results = []
+        for doc_id, score in sorted(fused.items(), key=lambda item: -item[1])[:limit]:
+            score /= best
+            if score < self.score_threshold:
+                continue
+            chunk = self.chunks[doc_id]
+            results.append({
+                "text": chunk["text"],
+                "score": score,
+                "metadata": {key: value for key, value in chunk.items() if key != "text"},
+            })
+        return results
+
+    def search(self, query: str, limit: int = 5, score_threshold: float = 0.0) -> List[dict]:
+        """
+        Поиск по запросу; формат результатов совпадает с облачным поиском
+
+        score_threshold принимается для совместимости с облачным бэкендом и не
+        используется (см. описание класса).
+        """
+        if not self.chunks:
+            return []
+        bm25_scores = self.bm25.scores(stem_tokens(query))
+        vector_scores = self.vectors @ self.embedder.embed_query(query)
+        return self.fuse(bm25_scores, vector_scores, limit)
+
+    def search_batch(self, queries: List[str], limit: int = 5, score_threshold: float = 0.0) -> List[tuple]:
+        """
+        Поиск по списку запросов с одним матричным умножением для векторной части
+
+        Returns:
+            list: (результаты, время в секундах) для каждого запроса; время умножения
+                делится поровну между запросами
+        """
+        if not queries:
+            return []
+        if not self.chunks:
+            return [([], 0.0) for _ in queries]
+        start_time = time.time()
+        query_vectors = np.vstack([self.embedder.embed_query(query) for query in queries])
+        vector_scores = self.vectors @ query_vectors.T
+        shared = (time.time() - start_time) / len(queries)
+
+        batch = []
+        for i, query in enumerate(queries):
+            start_time = time.time()
+            bm25_scores = self.bm25.scores(stem_tokens(query))
+            results = self.fuse(bm25_scores, vector_scores[:, i], limit)
+            batch.append((results, shared + time.time() - start_time))
+        return batch
+
+_local_index = None
+_local_index_lock = threading.Lock()
+# Сборка хранилища, из которой построен индекс, и время последней проверки указателя
+_local_index_state = {"build": None, "checked_at": 0.0, "reloading": False}
+
+def build_local_index(sdk=None) -> LocalSearchIndex:
+    """
+    Построение локального индекса по тем же чанкам, что загружаются в облако
+
+    Если процесс загрузки данных построил хранилище векторов тем же эмбеддером,
+    чанки и векторы берутся из него (матрица отображается в память, а не пересчитывается).
+    """
+    start_time = time.time()
+    embedder = get_embedder(sdk)
+    store = EmbeddingStore.open()
+    if store is not None and store.embedder == embedder.name:
+        index = LocalSearchIndex(store.chunks(), embedder, vectors=store.vectors)
+        logger.info(f"Локальный индекс открыт из хранилища {store.path} (версия {store.version}): "
+                    f"{len(store)} чанков за {time.time() - start_time:.2f} сек")
+        return index
+
+    from ..data.analyze_files import build_corpus_chunks, get_files
+
+    chunks = [chunk for file_chunks in build_corpus_chunks(get_files()) for chunk in file_chunks]
+    index = LocalSearchIndex(chunks, embedder)
+    logger.info(f"Локальный индекс построен: {len(chunks)} чанков за {time.time() - start_time:.2f} сек")
+    return index
+
+def get_local_index(sdk=None) -> LocalSearchIndex:
+    """
+    Общий для процесса локальный индекс (строится при первом обращении)
+
+    Указатель хранилища векторов проверяется не чаще раза в poll_interval секунд.
+    После пересборки хранилища новый индекс строится в том потоке, который
+    заметил смену, а остальные запросы до подмены обслуживает прежний индекс.
+    """
+    global _local_index
+    state = _local_index_state
+    if _local_index is None:
+        with _local_index_lock:
+            if _local_index is None:
+                state["build"] = current_build()
+                state["checked_at"] = time.monotonic()
+                _local_index = build_local_index(sdk)
+        return _local_index
+
+    now = time.monotonic()
+    with _local_index_lock:
+        due = not state["reloading"] and now - state["checked_at"] >= load_config()["embedding_store"]["poll_interval"]
+        if due:
+            state["checked_at"] = now
+            build = current_build()
+            due = build != state["build"]
+            if due:
+                state["reloading"] = True
+    if not due:
+        return _local_index
+
+    try:
+        logger.info(f"Хранилище векторов обновлено ({state['build']} -> {build}), перестраиваем локальный индекс")
+        index = build_local_index(sdk)
+        with _local_index_lock:
+            _local_index = index
+            state["build"] = build
+    except Exception as e:
+        logger.error(f"Не удалось перестроить локальный индекс, работает прежний: {e}")
+    finally:
+        state["reloading"] = False
+    return _local_index
@@ -0,0 +1,370 @@
+"""
+Модуль нормализации поисковых запросов на русском языке
+"""
+
+from collections import Counter
+from functools import lru_cache
+from glob import glob
+from typing import Dict, Iterable, List, Optional, Set
+from ..utils.config import load_config, resolve_project_path
+import logging
+import os
+import re
+import threading
+import time
+
+# Инициализация логгера
+logger = logging.getLogger(__name__)
+
+WORD_RE = re.compile(r"\w+")
+# Слова и концы предложений (точка внутри числа или кода концом не считается)
+SENTENCE_TOKEN_RE = re.compile(r"\w+|[.!?](?=\s|$)")
+
+def fold(text: str) -> str:
+    """Нижний регистр и замена ё на е"""
+    return text.lower().replace("ё", "е")
+
+def tokenize(text: str) -> List[str]:
+    """Разбиение текста на слова"""
+    return WORD_RE.findall(fold(text))
+
+# Окончания для стеммера Портера (Snowball) для русского языка
+VOWELS = "аеиоуыэюя"
+PERFECTIVE_GERUND = (("в", "вши", "вшись"), ("ив", "ивши", "ившись", "ыв", "ывши", "ывшись"))
+REFLEXIVE = ("ся", "сь")
+ADJECTIVE = (
+    "ее", "ие", "ые", "ое", "ими", "ыми", "ей", "ий", "ый", "ой", "ем", "им", "ым", "ом",
+    "его", "ого", "ему", "ому", "их", "ых", "ую", "юю", "ая", "яя", "ою", "ею",
+)
+PARTICIPLE = (("ем", "нн", "вш", "ющ", "щ"), ("ивш", "ывш", "ующ"))
+VERB = (
+    ("ла", "на", "ете", "йте", "ли", "й", "л", "ем", "н", "ло", "но", "ет", "ют", "ны", "ть", "ешь", "нно"),
+    ("ила", "ыла", "ена", "ейте", "уйте", "ите", "или", "ыли", "ей", "уй", "ил", "ыл", "им", "ым", "ен",
+     "ило", "ыло", "ено", "ят", "ует", "уют", "ит", "ыт", "ены", "ить", "ыть", "ишь", "ую", "ю"),
+)
+NOUN = (
+    "а", "ев", "ов", "ие", "ье", "е", "иями", "ями", "ами", "еи", "ии", "и", "ией", "ей", "ой", "ий", "й",
+    "иям", "ям", "ием", "ем", "ам", "ом", "о", "у", "ах", "иях", "ях", "ы", "ь", "ию", "ью", "ю", "ия", "ья", "я",
+)
+SUPERLATIVE = ("ейше", "ейш")
+DERIVATIONAL = ("ость", "ост")
+
+def find_ending(word: str, endings: Iterable[str], start: int, preceded: bool = False) -> int:
+    """
+    Длина самого длинного окончания из списка, целиком лежащего в word[start:], или 0
+
+    При preceded окончание должно следовать за а или я из той же области.
+    """
+    best = 0
+    for ending in endings:
+        if len(ending) > best and word.endswith(ending) and len(word) - len(ending) >= start:
+            if preceded:
+                position = len(word) - len(ending) - 1
+                if position < start or word[position] not in "ая":
+                    continue
+            best = len(ending)
+    return best
+
+def find_grouped_ending(word: str, groups: tuple, start: int) -> int:
+    """Окончание из пары групп: первая требует предшествующей а/я, вторая - нет"""
+    return max(find_ending(word, groups[0], start, preceded=True), find_ending(word, groups[1], start))
+
+def regions(word: str) -> tuple:
+    """Начала областей RV и R2 алгоритма Snowball"""
+    rv = r1 = r2 = len(word)
+    for i, char in enumerate(word):
+        if char in VOWELS:
+            rv = i + 1
+            break
+    for i in range(1, len(word)):
+        if word[i] not in VOWELS and word[i - 1] in VOWELS:
+            r1 = i + 1
+            break
+    for i in range(r1 + 1, len(word)):
+        if word[i] not in VOWELS and word[i - 1] in VOWELS:
+            r2 = i + 1
+            break
+    return rv, r2
+
+@lru_cache(maxsize=100000)
+def stem(word: str) -> str:
+    """Основа слова по алгоритму Snowball для русского языка"""
+    word = fold(word)
+    if len(word) < 3 or not word.isalpha():
+        return word
+    rv, r2 = regions(word)
+
+    # Шаг 1: деепричастия, иначе возвратные частицы и прилагательные/глаголы/существительные
+    size = find_grouped_ending(word, PERFECTIVE_GERUND, rv)
+    if size:
+        word = word[:-size]
+    else:
+        size = find_ending(word, REFLEXIVE, rv)
+        if size:
+            word = word[:-size]
+        size = find_ending(word, ADJECTIVE, rv)
+        if size:
+            word = word[:-size]
+            size = find_grouped_ending(word, PARTICIPLE, rv)
+            if size:
+                word = word[:-size]
+        else:
+            size = find_grouped_ending(word, VERB, rv)
+            if not size:
+                size = find_ending(word, NOUN, rv)
+            if size:
+                word = word[:-size]
+
+    # Шаг 2: конечная и
+    if word.endswith("и") and len(word) - 1 >= rv:
+        word = word[:-1]
+
+    # Шаг 3: словообразовательные окончания в R2
+    size = find_ending(word, DERIVATIONAL, r2)
+    if size:
+        word = word[:-size]
+
+    # Шаг 4: превосходная степень, удвоенная н и мягкий знак
+    if word.endswith("нн") and len(word) - 2 >= rv:
+        return word[:-1]
+    size = find_ending(word, SUPERLATIVE, rv)
+    if size:
+        word = word[:-size]
+        return word[:-1] if word.endswith("нн") and len(word) - 2 >= rv else word
+    if word.endswith("ь") and len(word) - 1 >= rv:
+        word = word[:-1]
+    return word
+
+def stem_tokens(text: str) -> List[str]:
+    """Основы всех слов текста"""
+    return [stem(token) for token in tokenize(text)]
+
+# Сокращения и разговорные слова абитуриентов с расшифровкой для поиска
+SYNONYMS = {
+    "приемка": "приемная комиссия",
+    "приемке": "приемная комиссия",
+    "приемку": "приемная комиссия",
+    "приемной": "приемная комиссия",
+    "вуц": "военный учебный центр",
+    "военка": "военный учебный центр",
+    "военке": "военный учебный центр",
+    "военку": "военный учебный центр",
+    "егэ": "единый государственный экзамен",
+    "общага": "общежитие",
+    "общаге": "общежитие",
+    "общагу": "общежитие",
+    "бви": "без вступительных испытаний",
+    "ви": "вступительные испытания",
+    "ид": "индивидуальные достижения",
+    "бак": "бакалавриат",
+    "бакалавр": "бакалавриат",
+    "бакалавра": "бакалавриат",
+    "магу": "магистратура",
+    "маги": "магистратура",
+    "магистра": "магистратура",
+    "спец": "специалитет",
+    "целевое": "целевое обучение",
+    "целевка": "целевое обучение",
+    "целевку": "целевое обучение",
+    "бюджет": "бюджетные места",
+    "бюджетка": "бюджетные места",
+    "платка": "платное обучение",
+    "платное": "платное обучение",
+    "проходной": "проходной балл",
+    "проходные": "проходной балл",
+    "стипуха": "стипендия",
+    "стипа": "стипендия",
+    "гос": "государственный",
+    "госуслуги": "суперсервис поступление в вуз онлайн",
+    "лк": "личный кабинет",
+    "снилс": "страховой номер",
+}
+
+def edit_distance(a: str, b: str, limit: int) -> int:
+    """Расстояние Дамерау-Левенштейна (с перестановками соседних букв), не больше limit + 1"""
+    if abs(len(a) - len(b)) > limit:
+        return limit + 1
+    previous_previous = None
+    previous = list(range(len(b) + 1))
+    for i in range(1, len(a) + 1):
+        current = [i] + [0] * len(b)
+        for j in range(1, len(b) + 1):
+            cost = 0 if a[i - 1] == b[j - 1] else 1
+            current[j] = min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + cost)
+            if i > 1 and j > 1 and a[i - 1] == b[j - 2] and a[i - 2] == b[j - 1]:
+                current[j] = min(current[j], previous_previous[j - 2] + 1)
+        if min(current) > limit:
+            return limit + 1
+        previous_previous, previous = previous, current
+    return previous[-1]
+
+def deletes(word: str) -> Set[str]:
+    """Варианты слова с одной удалённой буквой"""
+    return {word[:i] + word[i + 1:] for i in range(len(word))}
+
+class SpellCorrector:
+    """
+    Исправление опечаток по словарю корпуса (метод симметричных удалений).
+    Словарь хранит варианты слов с одной удалённой буквой, поэтому кандидаты
+    на расстоянии до 2 находятся без перебора всего словаря.
+
+    Короткие слова и кандидаты (короче min_length) не исправляются: среди них
+    много имён (пётр -> петя). Исправление выбирается среди слов словаря
+    не реже min_frequency и только если оно в margin раз частотнее других
+    кандидатов на том же расстоянии, иначе слово остаётся как есть.
+    """
+
+    def __init__(self, frequencies: Dict[str, int], max_distance: int = 2, min_length: int = 5,
+                 min_frequency: int = 1, margin: float = 2.0):
+        self.frequencies = frequencies
+        self.max_distance = max_distance
+        self.min_length = min_length
+        self.min_frequency = min_frequency
+        self.margin = margin
+        self.deletes: Dict[str, List[str]] = {}
+        for word in frequencies:
+            if len(word) >= min_length - 1:
+                for variant in deletes(word):
+                    self.deletes.setdefault(variant, []).append(word)
+
+    def candidates(self, word: str) -> Set[str]:
+        """Слова словаря, которые могут быть на расстоянии до 2 от word"""
+        variants = {word} | deletes(word)
+        found = set()
+        for variant in variants:
+            if variant in self.frequencies:
+                found.add(variant)
+            found.update(self.deletes.get(variant, ()))
+        return found
+
+    def correct(self, word: str) -> str:
+        """Ближайшее частое слово словаря или исходное слово"""
+        if word in self.frequencies or len(word) < self.min_length or not word.isalpha():
+            return word
+        # Для коротких слов допускается одна ошибка, иначе исправления искажают смысл
+        limit = self.max_distance if len(word) >= 7 else 1
+        ranked = []
+        for candidate in self.candidates(word):
+            if len(candidate) < self.min_length:
+                continue
+            distance = edit_distance(word, candidate, limit)
+            if distance <= limit:
+                ranked.append((distance, -self.frequencies[candidate], candidate))
+        if not ranked:
+            return word
+        ranked.sort()
+        distance, frequency, best = ranked[0]
+        if -frequency < self.min_frequency:
+            return word
+        # Два похожих по частоте кандидата - исправление неоднозначно
+        if len(ranked) > 1 and ranked[1][0] == distance and -frequency < self.margin * -ranked[1][1]:
+            return word
+        return best
+
+class QueryNormalizer:
+    """Нормализация запроса: ё/е, исправление опечаток и расшифровка сокращений"""
+
+    def __init__(self, corrector: Optional[SpellCorrector] = None, synonyms: Optional[Dict[str, str]] = None):
+        self.corrector = corrector
+        self.synonyms = SYNONYMS if synonyms is None else synonyms
+
+    def words(self, query: str) -> List[str]:
+        """
+        Слова запроса с исправленными опечатками
+
+        Не исправляются аббревиатуры и слова с заглавной буквы в середине
+        предложения - это имена и названия, которых может не быть в словаре
+        корпуса. Первое слово предложения исправляется как обычно: клиенты
+        мессенджеров пишут его с заглавной буквы автоматически.
+        """
+        words = []
+        sentence_start = True
+        for match in SENTENCE_TOKEN_RE.finditer(query):
+            original = match.group()
+            if original in ".!?":
+                sentence_start = True
+                continue
+            word = fold(original)
+            proper = (len(original) > 1 and original.isupper()) or (original[0].isupper() and not sentence_start)
+            sentence_start = False
+            if word not in self.synonyms and self.corrector is not None and not proper:
+                corrected = self.corrector.correct(word)
+                if corrected != word:
+                    logger.debug(f"Исправление опечатки: {word} -> {corrected}")
+                word = corrected
+            words.append(word)
+        return words
+
+    def correct(self, query: str) -> str:
+        """Текст запроса с исправленными опечатками, без расшифровок"""
+        return " ".join(self.words(query))
+
+    def normalize(self, query: str) -> str:
+        """
+        Текст запроса для поиска
+
+        Расшифровки сокращений добавляются после исходных слов, чтобы
+        поиск находил и сокращённое, и полное написание.
+        """
+        words = self.words(query)
+        stems = {stem(word) for word in words}
+        expansions = []
+        for word in words:
+            expansion = self.synonyms.get(word)
+            if not expansion or expansion in expansions:
+                continue
+            # Расшифровка не нужна, если её слова уже есть в запросе
+            if all(stem(token) in stems for token in tokenize(expansion)):
+                continue
+            expansions.append(expansion)
+        return " ".join(words + expansions)
+
+    def terms(self, query: str) -> List[str]:
+        """Основы слов нормализованного запроса (для локальных индексов)"""
+        return stem_tokens(self.normalize(query))
+
+def build_vocabulary(files: List[str]) -> Counter:
+    """Частоты слов в файлах базы знаний"""
+    frequencies = Counter()
+    for filename in files:
+        with open(filename, "r", encoding="utf-8") as f:
+            for line in f:
+                frequencies.update(tokenize(line))
+    return frequencies
+
+_query_normalizer = None
+_query_normalizer_lock = threading.Lock()
+
+def get_query_normalizer() -> QueryNormalizer:
+    """Общий для процесса нормализатор со словарём по data/"""
+    global _query_normalizer
+    if _query_normalizer is None:
+        with _query_normalizer_lock:
+            if _query_normalizer is None:
+                config = load_config()["query_normalizer"]
+                start_time = time.time()
+                data_dir = resolve_project_path(load_config()["data_dir"])
+                files = sorted(glob(os.path.join(data_dir, "**", "*.md"), recursive=True))
+                frequencies = build_vocabulary(files)
+                corrector = SpellCorrector(
+                    frequencies,
+                    config["max_edit_distance"],
+                    config["min_word_length"],
+                    config["min_frequency"],
+                    config["frequency_margin"],
+                )
+                _query_normalizer = QueryNormalizer(corrector)
+                logger.info(f"Словарь запросов: {len(frequencies)} слов за {time.time() - start_time:.2f} сек")
+    return _query_normalizer
+
+def prepare_query(query: str, expand: bool = True) -> str:
+    """
+    Нормализованный текст запроса (исходный запрос, если нормализация отключена)
+
+    Без expand только исправляются опечатки - так запрос сравнивается с вопросами FAQ,
+    где лишние слова расшифровок снижали бы уверенность совпадения.
+    """
+    if not load_config()["query_normalizer"]["enabled"]:
+        return query
+    normalizer = get_query_normalizer()
+    return normalizer.normalize(query) if expand else normalizer.correct(query)
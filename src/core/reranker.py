@@ -0,0 +1,101 @@
+"""
+Модуль для переранжирования результатов поиска с учётом свежести и источника
+"""
+
+from typing import List, Optional
+from ..utils.config import load_config
+import logging
+import re
+
+# Инициализация логгера
+logger = logging.getLogger(__name__)
+
+YEAR_RE = re.compile(r"^Год: (\d{4})", re.MULTILINE)
+ANSWER_AUTHOR_RE = re.compile(r"^Ответ \(\*\*ID \d+\*\* \(([^,]+),", re.MULTILINE)
+
+def get_metadata(result: dict) -> dict:
+    """Метаданные результата (у облачного поиска их может не быть)"""
+    metadata = result.get("metadata")
+    return metadata if isinstance(metadata, dict) else {}
+
+def get_source_type(result: dict) -> str:
+    """Тип источника чанка: docs, facts или chats (по метаданным или заголовку текста)"""
+    source = get_metadata(result).get("source") or ""
+    for source_type in ("docs", "facts", "chats"):
+        if f"/{source_type}/" in f"/{source}":
+            return source_type
+    text = result.get("text", "")
+    if text.startswith("Ключевые слова:"):
+        return "docs"
+    if text.startswith("Категория:"):
+        return "facts"
+    if text.startswith("Год:"):
+        return "chats"
+    return "other"
+
+def get_year(result: dict) -> Optional[int]:
+    """Год чанка из метаданных или заголовка текста"""
+    year = get_metadata(result).get("year")
+    if year is None:
+        match = YEAR_RE.search(result.get("text", ""))
+        year = match.group(1) if match else None
+    return int(year) if year and str(year).isdigit() else None
+
+def get_staff_share(text: str, staff_pattern: str) -> float:
+    """Доля ответов в чанке, данных сотрудниками (официальными аккаунтами) приёмной комиссии"""
+    authors = ANSWER_AUTHOR_RE.findall(text)
+    if not authors:
+        return 0.0
+    staff = re.compile(staff_pattern)
+    return sum(1 for author in authors if staff.search(author)) / len(authors)
+
+def rerank(
+    results: List[dict],
+    limit: Optional[int] = None,
+    config: Optional[dict] = None,
+    scale: float = 1.0
+) -> List[dict]:
+    """
+    Переранжирование результатов поиска
+
+    К оценке близости прибавляется бонус, умноженный на scale, где бонус
+    складывается из веса типа источника, свежести (recency_decay в степени
+    возраста в годах) и доли ответов сотрудников. Официальные документы без
+    года считаются актуальными.
+
+    Бонусы заданы для оценок облачного поиска (от 0 до 1, scale 1.0). У бэкендов
+    с другим разбросом оценок scale приводит бонус к той же доле разрыва: у RRF
+    соседние позиции отличаются на сотые, и бонус 0.2 перемешал бы всю выдачу.
+
+    Args:
+        results: Результаты поиска (text, score, metadata)
+        limit: Сколько результатов вернуть (по умолчанию все)
+        config: Параметры переранжирования (по умолчанию из конфигурации)
+        scale: Масштаб бонусов в единицах оценки бэкенда
+
+    Returns:
+        list: Результаты с полями score (итоговая оценка) и base_score (исходная близость)
+    """
+    config = config or load_config()["reranker"]
+    years = [year for year in (get_year(result) for result in results) if year]
+    reference_year = config["reference_year"] or max(years, default=None)
+
+    reranked = []
+    for result in results:
+        source_type = get_source_type(result)
+        boost = config["source_boosts"].get(source_type, 0.0)
+
+        year = get_year(result)
+        if year and reference_year:
+            boost += config["recency_boost"] * config["recency_decay"] ** max(reference_year - year, 0)
+        elif source_type == "docs":
+            boost += config["recency_boost"]
+
+        if source_type == "chats":
+            boost += config["staff_boost"] * get_staff_share(result.get("text", ""), config["staff_pattern"])
+
+        reranked.append({**result, "score": result["score"] + scale * boost, "base_score": result["score"]})
+
+    # Устойчивая сортировка сохраняет исходный порядок при равных оценках
+    reranked.sort(key=lambda result: -result["score"])
+    return reranked[:limit] if limit else reranked
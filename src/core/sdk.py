@@ -2,8 +2,12 @@
 Модуль для работы с Yandex Cloud SDK
 """
 
-from ..utils.sdk_init import initialize_sdk
+from ..utils.sdk_init import initialize_sdk, initialize_async_sdk
 from ..utils.config import load_config
+from .active_index import get_active_index_id, get_active_index_version
+from .search_cache import get_search_cache
+from .query_normalizer import prepare_query
+from .reranker import rerank
 from pydantic import BaseModel, Field
 from typing import Optional, List
 from yandex_cloud_ml_sdk.search_indexes import (
@@ -12,10 +16,15 @@ from yandex_cloud_ml_sdk.search_indexes import (
     ReciprocalRankFusionIndexCombinationStrategy,
 )
 from dotenv import load_dotenv
-import os
 import telebot
 from telebot import types
+from concurrent.futures import ThreadPoolExecutor, as_completed
+import asyncio
+import copy
 import logging
+import threading
+import time
+import weakref
 
 # Инициализация логгера
 logger = logging.getLogger(__name__)
@@ -31,11 +40,35 @@ def set_bot(bot_instance):
 
 load_dotenv()
 
+SEARCH_TOOL_NAME = "search_admissions_info"
+
 class SearchAdmissionInfo(BaseModel):
     """Поиск информации о поступлении"""
     query: str = Field(description="Поисковый запрос")
     program: Optional[str] = Field(description="Программа обучения", default=None)
 
+    @staticmethod
+    def _to_proto(proto_class):
+        """Преобразование в прототип для SDK"""
+        tool = proto_class()
+        tool.function.name = SEARCH_TOOL_NAME
+        tool.function.description = "Поиск информации о поступлении в МАИ в базе знаний приёмной комиссии"
+        tool.function.parameters = {
+            "type": "object",
+            "properties": {
+                "query": {
+                    "type": "string",
+                    "description": "Поисковый запрос"
+                },
+                "program": {
+                    "type": "string",
+                    "description": "Программа обучения или направление подготовки, если вопрос о ней"
+                }
+            },
+            "required": ["query"]
+        }
+        return tool
+
 class Handover(BaseModel):
     """Эта функция позволяет передать диалог оператору приёмной комиссии"""
     reason: str = Field(
@@ -174,23 +207,60 @@ def create_thread(sdk):
     """Создание диалога"""
     return sdk.threads.create(ttl_days=1, expiration_policy="static")
 
+# Асинхронные клиенты привязаны к циклу событий, поэтому создаются на каждый цикл
+async_sdks = weakref.WeakKeyDictionary()
+async_assistants = weakref.WeakKeyDictionary()
+
+def get_async_sdk():
+    """Асинхронный клиент SDK для текущего цикла событий"""
+    loop = asyncio.get_running_loop()
+    async_sdk = async_sdks.get(loop)
+    if async_sdk is None:
+        async_sdk = async_sdks[loop] = initialize_async_sdk()
+    return async_sdk
+
+async def create_async_thread(async_sdk):
+    """Создание диалога через асинхронный клиент"""
+    return await async_sdk.threads.create(ttl_days=1, expiration_policy="static")
+
+async def get_async_assistant(async_sdk, assistant_id: str):
+    """Асинхронный объект ассистента по ID (запрашивается один раз на ассистента)"""
+    handles = async_assistants.setdefault(asyncio.get_running_loop(), {})
+    assistant = handles.get(assistant_id)
+    if assistant is None:
+        assistant = handles[assistant_id] = await async_sdk.assistants.get(assistant_id)
+    return assistant
+
+def get_assistant_search_tool(sdk, index_id: str):
+    """
+    Поисковый инструмент ассистента (None, если искать негде)
+
+    В режиме function (по умолчанию) модель вызывает функцию search_admissions_info,
+    и поиск выполняется в процессе бота: запрос нормализуется, ищется настроенным
+    бэкендом (облачным или локальным) и переранжируется до попадания в промпт.
+    В режиме index модель ищет встроенным инструментом облачного индекса напрямую.
+    """
+    config = load_config()["search_index"]
+    if config["assistant_tool"] == "function":
+        if not index_id and config["backend"] != "local":
+            return None
+        print(f"\nАссистент ищет через функцию {SEARCH_TOOL_NAME} (бэкенд {config['backend']})")
+        return SearchAdmissionInfo
+    if not index_id:
+        return None
+    print(f"\nАссистент использует индекс: {index_id}")
+    return sdk.tools.search_index(sdk.search_indexes.get(index_id))
+
 def create_assistant(sdk, thread):
     """Создание ассистента"""
     config = load_config()
     model = sdk.models.completions("yandexgpt", model_version="rc")
     
-    # Загружаем ID индекса из .env
-    index_id = os.getenv("SEARCH_INDEX_ID")
+    # Активная версия индекса из реестра (или SEARCH_INDEX_ID из .env)
+    index_id = get_active_index_id()
+    search_tool = get_assistant_search_tool(sdk, index_id)
     
-    if index_id:
-        print(f"\nАссистент использует индекс: {index_id}")
-        
-        # Получаем индекс
-        index = sdk.search_indexes.get(index_id)
-        
-        # Создаем поисковый инструмент
-        search_tool = sdk.tools.search_index(index)
-        
+    if search_tool is not None:
         # Создаем ассистента с инструментами
         assistant = sdk.assistants.create(
             model, 
@@ -322,17 +392,50 @@ def print_citations(result):
             print("------------------------")
             print(source.parts[0])
 
-def search_admissions_info(sdk, query: str) -> list:
-    """Поиск информации о поступлении"""
-    try:
-        # Получаем ID индекса из переменных окружения
-        index_id = os.getenv("SEARCH_INDEX_ID")
+# Объекты облачных индексов, полученные за время работы процесса
+index_handles = {}
+index_handles_lock = threading.Lock()
+
+def get_index_handle(sdk, index_id: str):
+    """Объект индекса из кеша процесса (sdk.search_indexes.get вызывается один раз на индекс)"""
+    index = index_handles.get(index_id)
+    if index is None:
+        with index_handles_lock:
+            index = index_handles.get(index_id)
+            if index is None:
+                index = sdk.search_indexes.get(index_id)
+                if index:
+                    index_handles[index_id] = index
+    return index
+
+def get_index_id() -> str:
+    """ID активного облачного индекса, с которым создаются ассистенты"""
+    return get_active_index_id() or ""
+
+def get_index_version() -> str:
+    """Версия базы знаний для кешей: ID активного индекса и хеш его содержимого"""
+    return get_active_index_version() or ""
+
+class CloudSearchBackend:
+    """Поиск по облачному индексу Yandex Cloud"""
+
+    def __init__(self, sdk):
+        self.sdk = sdk
+
+    @property
+    def version(self) -> str:
+        """Версия индекса - его ID и хеш содержимого"""
+        return get_index_version()
+
+    def search(self, query: str, limit: int = 5, score_threshold: float = 0.5) -> list:
+        # Получаем ID активного индекса
+        index_id = get_index_id()
         if not index_id:
-            print("Ошибка: SEARCH_INDEX_ID не найден в переменных окружения")
+            print("Ошибка: активный индекс не найден ни в реестре, ни в SEARCH_INDEX_ID")
             return []
             
         # Получаем индекс
-        index = sdk.search_indexes.get(index_id)
+        index = get_index_handle(self.sdk, index_id)
         if not index:
             print(f"Ошибка: индекс {index_id} не найден")
             return []
@@ -340,8 +443,8 @@ def search_admissions_info(sdk, query: str) -> list:
         # Выполняем поиск
         search_results = index.search(
             query=query,
-            limit=5,
-            score_threshold=0.5
+            limit=limit,
+            score_threshold=score_threshold
         )
         
         # Форматируем результаты
@@ -354,7 +457,153 @@ def search_admissions_info(sdk, query: str) -> list:
             })
             
         return results
-        
+
+def get_search_backend(sdk, name: Optional[str] = None):
+    """Выбор бэкенда поиска по конфигурации: cloud (облачный индекс) или local (BM25 + векторы в процессе)"""
+    name = name or load_config()["search_index"]["backend"]
+    if name == "local":
+        from .local_search import get_local_index
+        return get_local_index(sdk)
+    return CloudSearchBackend(sdk)
+
+def get_candidates_limit(limit: int) -> int:
+    """Сколько результатов запрашивать у бэкенда, чтобы переранжированию было из чего выбирать"""
+    config = load_config()["reranker"]
+    return limit * config["candidates_factor"] if config["enabled"] else limit
+
+def apply_reranker(results: list, limit: int, backend=None) -> list:
+    """
+    Переранжирование по свежести и источнику (или обрезка, если оно отключено)
+
+    Бонусы переводятся в шкалу оценок бэкенда (score_scale; у облачного - 1.0).
+    """
+    config = load_config()["reranker"]
+    if not config["enabled"]:
+        return results[:limit]
+    return rerank(results, limit, config, scale=getattr(backend, "score_scale", 1.0))
+
+def search_and_rerank(backend, query: str, limit: int, score_threshold: float) -> list:
+    """Поиск с запасом кандидатов и переранжирование по свежести и источнику"""
+    results = backend.search(query, limit=get_candidates_limit(limit), score_threshold=score_threshold)
+    return apply_reranker(results, limit, backend)
+
+def search_admissions_info(sdk, query: str, limit: int = 5, score_threshold: float = 0.5) -> list:
+    """Поиск информации о поступлении (повторные запросы отдаются из кеша)"""
+    try:
+        # Опечатки и сокращения исправляются до поиска, а не после промаха
+        query = prepare_query(query)
+        backend = get_search_backend(sdk)
+        cache = get_search_cache()
+        if cache is None:
+            return search_and_rerank(backend, query, limit, score_threshold)
+
+        key = cache.key(query, limit, score_threshold, backend.version)
+        results = cache.get(key)
+        if results is None:
+            results = search_and_rerank(backend, query, limit, score_threshold)
+            cache.put(key, results)
+        return results
     except Exception as e:
         print(f"Ошибка при поиске: {e}")
-        return []
\ No newline at end of file
+        return []
+
+def format_search_results(results: list) -> str:
+    """Текст результатов поиска для модели: источник и год перед каждым фрагментом"""
+    if not results:
+        return "По запросу ничего не найдено в базе знаний."
+    parts = []
+    for number, result in enumerate(results, start=1):
+        metadata = result.get("metadata") if isinstance(result.get("metadata"), dict) else {}
+        header = ", ".join(str(value) for value in (metadata.get("source"), metadata.get("year")) if value)
+        parts.append(f"[{number}] {header}\n{result['text']}" if header else f"[{number}]\n{result['text']}")
+    return "\n\n".join(parts)
+
+def run_search_tool(sdk, arguments: dict) -> str:
+    """Выполнение вызова функции search_admissions_info от ассистента"""
+    query = str(arguments.get("query") or "")
+    if arguments.get("program"):
+        query = f"{query} {arguments['program']}"
+    limit = load_config()["search_index"]["tool_results"]
+    # Как и встроенный инструмент индекса, функция отдаёт лучшие результаты без порога
+    results = search_admissions_info(sdk, query, limit=limit, score_threshold=0.0)
+    logger.info(f"Поиск по запросу ассистента '{query}': {len(results)} результатов")
+    return format_search_results(results)
+
+
+def search_admissions_info_batch(
+    sdk,
+    queries: List[str],
+    limit: int = 5,
+    score_threshold: float = 0.5,
+    max_workers: Optional[int] = None
+) -> List[dict]:
+    """
+    Поиск по списку запросов
+
+    Облачный индекс опрашивается параллельно не более чем в max_workers потоков,
+    локальный индекс обрабатывает все запросы одним матричным умножением.
+    Запросы из кеша не отправляются в бэкенд.
+
+    Returns:
+        list: Для каждого запроса в исходном порядке словарь с полями
+            query, results, latency (сек), cached и error
+    """
+    backend = get_search_backend(sdk)
+    cache = get_search_cache()
+    max_workers = max_workers or load_config()["search_index"]["batch_workers"]
+    fetch_limit = get_candidates_limit(limit)
+    items = [{"query": query, "results": [], "latency": 0.0, "cached": False, "error": None} for query in queries]
+
+    # Нормализация и проверка кеша, в бэкенд уходят только промахи (повторы - один раз)
+    pending = {}
+    for i, query in enumerate(queries):
+        start_time = time.time()
+        prepared = prepare_query(query)
+        key = cache.key(prepared, limit, score_threshold, backend.version) if cache else None
+        results = cache.get(key) if cache and prepared not in pending else None
+        if results is not None:
+            items[i].update(results=results, latency=time.time() - start_time, cached=True)
+        else:
+            pending.setdefault(prepared, (key, []))[1].append((i, time.time() - start_time))
+
+    def finish(prepared: str, results: list, latency: float):
+        start_time = time.time()
+        key, positions = pending[prepared]
+        results = apply_reranker(results, limit, backend)
+        if cache:
+            cache.put(key, results)
+        for i, prepare_time in positions:
+            items[i].update(results=copy.deepcopy(results), latency=prepare_time + latency + time.time() - start_time)
+
+    def search_one(prepared: str) -> tuple:
+        start_time = time.time()
+        results = backend.search(prepared, limit=fetch_limit, score_threshold=score_threshold)
+        return results, time.time() - start_time
+
+    # Ошибка пакетного поиска не теряет весь пакет: запросы повторяются по одному,
+    # и ошибка остаётся только у тех, что не прошли и поодиночке
+    remaining = list(pending)
+    if remaining and hasattr(backend, "search_batch"):
+        try:
+            batch = backend.search_batch(remaining, fetch_limit, score_threshold)
+        except Exception as e:
+            logger.error(f"Ошибка пакетного поиска, запросы выполняются по одному: {e}")
+        else:
+            for prepared, (results, seconds) in zip(remaining, batch):
+                finish(prepared, results, seconds)
+            remaining = []
+    if remaining:
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            futures = {executor.submit(search_one, prepared): prepared for prepared in remaining}
+            for future in as_completed(futures):
+                prepared = futures[future]
+                try:
+                    results, seconds = future.result()
+                except Exception as e:
+                    logger.error(f"Ошибка при поиске по запросу '{prepared}': {e}")
+                    for i, _ in pending[prepared][1]:
+                        items[i]["error"] = str(e)
+                    continue
+                finish(prepared, results, seconds)
+
+    return items
\ No newline at end of file
@@ -0,0 +1,101 @@
+"""
+Модуль для кеширования результатов поиска по базе знаний
+"""
+
+from collections import OrderedDict
+from typing import Any, Optional
+from ..utils.config import load_config
+import copy
+import logging
+import re
+import threading
+import time
+
+# Инициализация логгера
+logger = logging.getLogger(__name__)
+
+PUNCTUATION_RE = re.compile(r"[^\w\s]")
+SPACES_RE = re.compile(r"\s+")
+
+def normalize_query(query: str) -> str:
+    """Нормализация запроса для ключа кеша: регистр, ё/е, пунктуация и пробелы"""
+    query = PUNCTUATION_RE.sub(" ", query.lower().replace("ё", "е"))
+    return SPACES_RE.sub(" ", query).strip()
+
+class QueryCache:
+    """
+    Кеш результатов поиска с вытеснением по LRU и временем жизни записей.
+    Ключ включает версию индекса, поэтому после пересборки старые результаты не используются.
+    """
+
+    def __init__(self, max_size: int = 1024, ttl_seconds: float = 3600):
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds
+        self.entries: "OrderedDict[tuple, tuple]" = OrderedDict()
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @staticmethod
+    def key(query: str, limit: int, score_threshold: float, version: str) -> tuple:
+        """Ключ кеша"""
+        return (normalize_query(query), limit, score_threshold, version)
+
+    def get(self, key: tuple) -> Optional[Any]:
+        """Результат из кеша или None (устаревшие записи удаляются)"""
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is not None and time.monotonic() - entry[0] > self.ttl_seconds:
+                del self.entries[key]
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return None
+            self.entries.move_to_end(key)
+            self.hits += 1
+        # Копия защищает кеш от изменения результатов вызывающим кодом
+        return copy.deepcopy(entry[1])
+
+    def put(self, key: tuple, value: Any):
+        """Сохранение результата"""
+        with self.lock:
+            self.entries[key] = (time.monotonic(), copy.deepcopy(value))
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_size:
+                self.entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        """Очистка кеша (счётчики сохраняются)"""
+        with self.lock:
+            self.entries.clear()
+
+    def stats(self) -> dict:
+        """Счётчики попаданий и промахов для подбора размера кеша"""
+        with self.lock:
+            total = self.hits + self.misses
+            return {
+                "size": len(self.entries),
+                "max_size": self.max_size,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": self.hits / total if total else 0.0,
+            }
+
+_search_cache = None
+_search_cache_lock = threading.Lock()
+
+def get_search_cache() -> Optional[QueryCache]:
+    """Общий для процесса кеш результатов поиска (None, если кеш отключён)"""
+    global _search_cache
+    config = load_config()["search_cache"]
+    if not config["enabled"]:
+        return None
+    if _search_cache is None:
+        with _search_cache_lock:
+            if _search_cache is None:
+                _search_cache = QueryCache(config["max_size"], config["ttl_seconds"])
+                logger.info(f"Кеш поиска: до {config['max_size']} запросов, TTL {config['ttl_seconds']} сек")
+    return _search_cache
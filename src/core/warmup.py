@@ -0,0 +1,96 @@
+"""
+Модуль для прогрева и проверки общих ресурсов при запуске бота
+"""
+
+from typing import Dict
+from concurrent.futures import ThreadPoolExecutor
+from ..utils.config import load_config
+from ..data.token_cache import get_token_cache
+from .answer_cache import get_answer_cache
+from .assistant import run_sync
+from .assistant_pool import get_assistant_pool
+from .faq import get_faq_index
+from .query_normalizer import get_query_normalizer, prepare_query
+from .sdk import get_async_sdk, get_async_assistant, get_index_id, get_index_version, get_search_backend
+import logging
+import time
+
+# Инициализация логгера
+logger = logging.getLogger(__name__)
+
+def warm_up_assistants(pool):
+    """Создание ассистентов пула и их асинхронных объектов в фоновом цикле"""
+    pool.warm_up()
+
+    async def warm_up_async():
+        async_sdk = get_async_sdk()
+        for pooled in pool.slots:
+            if pooled is not None:
+                await get_async_assistant(async_sdk, pooled.assistant.id)
+
+    run_sync(warm_up_async())
+
+def warm_up_search(sdk):
+    """Получение активного индекса и пробный запрос к нему"""
+    config = load_config()
+    if config["search_index"]["backend"] == "cloud" and not get_index_id():
+        raise ValueError("активный индекс не найден ни в реестре, ни в SEARCH_INDEX_ID")
+    query = config["index_registry"]["warmup_queries"][0]
+    get_search_backend(sdk).search(prepare_query(query), limit=1, score_threshold=0.0)
+
+def warm_up_answer_cache(sdk):
+    """Создание кеша ответов и его эмбеддера"""
+    answer_cache = get_answer_cache(sdk)
+    if answer_cache is not None:
+        answer_cache.lookup("прогрев", get_index_version())
+
+def warm_up_services() -> Dict[str, dict]:
+    """
+    Прогрев общих ресурсов бота
+
+    SDK создаётся первым, затем параллельно создаются ассистенты пула,
+    проверяется поисковый индекс и строятся локальные индексы и кеши.
+    Ошибка одного ресурса не прерывает остальные: он будет создан
+    при первом запросе, как без прогрева.
+
+    Returns:
+        dict: Для каждого ресурса - успех, время в секундах и текст ошибки
+    """
+    report = {}
+
+    def timed(name, func, *args):
+        start_time = time.time()
+        try:
+            func(*args)
+            report[name] = {"ok": True, "seconds": time.time() - start_time}
+        except Exception as e:
+            logger.error(f"Прогрев {name} не удался: {e}")
+            report[name] = {"ok": False, "seconds": time.time() - start_time, "error": str(e)}
+
+    total_start = time.time()
+    timed("sdk", get_assistant_pool)
+    if not report["sdk"]["ok"]:
+        return report
+    pool = get_assistant_pool()
+
+    config = load_config()
+    tasks = {
+        "assistants": (warm_up_assistants, pool),
+        "search_index": (warm_up_search, pool.sdk),
+        "answer_cache": (warm_up_answer_cache, pool.sdk),
+        "token_cache": (get_token_cache,),
+    }
+    if config["faq"]["enabled"]:
+        tasks["faq"] = (get_faq_index,)
+    if config["query_normalizer"]["enabled"]:
+        tasks["query_normalizer"] = (get_query_normalizer,)
+    with ThreadPoolExecutor(max_workers=len(tasks)) as executor:
+        for name, (func, *args) in tasks.items():
+            executor.submit(timed, name, func, *args)
+
+    breakdown = ", ".join(
+        f"{name} {item['seconds']:.2f} сек{'' if item['ok'] else ' (ошибка)'}"
+        for name, item in report.items()
+    )
+    logger.info(f"Прогрев завершён за {time.time() - total_start:.2f} сек: {breakdown}")
+    return report
@@ -6,31 +6,69 @@ from glob import glob
 from tqdm.auto import tqdm
 import pandas as pd
 from ..utils.sdk_init import initialize_sdk
-from ..utils.config import save_search_index_id
-from yandex_cloud_ml_sdk.search_indexes import (
-    StaticIndexChunkingStrategy,
-    HybridSearchIndexType,
-    ReciprocalRankFusionIndexCombinationStrategy,
-)
+from ..utils.config import load_config, resolve_project_path, save_search_index_id
+from .uploader import iter_uploads, upload_chunks, extend_file_ttls
+from .index_pipeline import IndexPipeline
+from .manifest import ChunkManifest, chunk_hash
+from .parser import iter_chats, iter_docs, iter_facts
+from .packing import detect_topic, pack_dialogs
+from .token_cache import get_token_cache
+from .dedup import deduplicate
+from .embedding_store import write_embedding_store
+from .index_registry import publish_index
+from datetime import datetime
+import argparse
+import io
+import json
 import os
+import time
 from dotenv import set_key
 
-# Инициализация SDK для токенизации
-sdk = initialize_sdk()
-model = sdk.models.completions("yandexgpt", model_version="rc")
+# SDK и модель для токенизации создаются лениво при первом обращении,
+# чтобы импорт модуля и офлайн-режим не требовали ключей и сети
+sdk = None
+model = None
 
-# Оптимальный размер чанка (1000 токенов)
-CHUNK_SIZE = 1000 * 2  # 1000 токенов * 2 символа/токен
+def get_sdk():
+    """Получение SDK (создаётся при первом вызове)"""
+    global sdk
+    if sdk is None:
+        sdk = initialize_sdk()
+    return sdk
 
-def get_token_count(filename):
-    """Подсчёт количества токенов в файле"""
+def set_sdk(sdk_instance):
+    """Установка экземпляра SDK (например, тестовой заглушки)"""
+    global sdk, model
+    sdk = sdk_instance
+    model = None
+
+def get_model():
+    """Получение модели для токенизации (создаётся при первом вызове)"""
+    global model
+    if model is None:
+        model = get_sdk().models.completions("yandexgpt", model_version="rc")
+    return model
+
+def get_token_count(filename, offline=False):
+    """
+    Подсчёт количества токенов в файле
+    
+    Результат токенизации кешируется по хешу содержимого, поэтому SDK вызывается
+    только для изменившихся файлов. В офлайн-режиме используется калиброванная оценка.
+    """
     with open(filename, "r", encoding="utf8") as f:
         content = f.read()
-        tokens = len(model.tokenize(content))
-        chars = len(content)
-        ratio = chars / tokens
-        print(f"{os.path.basename(filename)}: {tokens} токенов, {ratio:.2f} chars/token")
-        return tokens
+    category = os.path.basename(os.path.dirname(filename))
+    cache = get_token_cache()
+    cached = cache.get(content) is not None
+    if offline:
+        tokens = cache.estimate(content, category)
+    else:
+        tokens = cache.count(content, get_model(), category)
+    ratio = len(content) / tokens
+    source = "кеш" if cached else ("оценка" if offline else "SDK")
+    print(f"{os.path.basename(filename)}: {tokens} токенов, {ratio:.2f} chars/token ({source})")
+    return tokens
 
 def get_file_len(filename):
     """Подсчёт количества символов в файле"""
@@ -38,201 +76,292 @@ def get_file_len(filename):
         l = len(f.read())
     return l
 
-def chunk_and_upload_file(filename):
-    """Разбиение файла на чанки и загрузка в облако"""
-    with open(filename, "r", encoding="utf-8") as f:
-        content = f.read()
-    
-    # Определяем тип файла по пути
+def get_source_name(filename):
+    """Путь к файлу относительно корня проекта (используется как источник чанка)"""
+    project_root = os.path.dirname(os.path.dirname(os.path.dirname(__file__)))
+    return os.path.relpath(os.path.abspath(filename), project_root).replace(os.sep, "/")
+
+def get_file_type(filename):
+    """Тип файла по пути: facts, docs или chats"""
     if "facts" in filename:
-        return chunk_and_upload_facts(content)
+        return "facts"
     elif "docs" in filename:
-        return chunk_and_upload_docs(content)
-    else:
-        return chunk_and_upload_chats(content)
+        return "docs"
+    return "chats"
 
-def chunk_and_upload_facts(content):
-    """Разбиение файла с фактами на чанки и загрузка в облако"""
-    chunks = []
+def build_file_chunks(filename):
+    """Разбиение файла на чанки без загрузки в облако"""
+    source = get_source_name(filename)
+    file_type = get_file_type(filename)
     
-    # Пропускаем заголовок
-    lines = content.split("\n")
-    if lines[0].startswith("#"):
-        lines = lines[1:]
+    # Определяем тип файла по пути и читаем его построчно
+    with open(filename, "r", encoding="utf-8") as f:
+        if file_type == "facts":
+            return build_facts_chunks(f, source)
+        elif file_type == "docs":
+            return build_docs_chunks(f, source)
+        else:
+            return build_chats_chunks(f, source)
+
+def build_corpus_chunks(filenames, dedup=None):
+    """
+    Разбиение всех файлов на чанки
     
-    # Пропускаем заголовок таблицы и разделитель
-    if lines[0].startswith("|"):
-        lines = lines[2:]
+    Диалоги из архивов чатов всех лет собираются вместе и проходят дедупликацию:
+    из каждого кластера почти одинаковых вопросов остаётся самый свежий отвеченный,
+    а размер кластера сохраняется как популярность вопроса.
     
-    # Обрабатываем каждую строку таблицы
-    for line in lines:
-        if not line.strip() or not line.startswith("|"):
+    Returns:
+        list: Списки чанков в порядке filenames
+    """
+    dedup = load_config()["dedup"]["enabled"] if dedup is None else dedup
+    chunks = {}
+    dialogs = []
+    for filename in filenames:
+        if get_file_type(filename) != "chats":
+            chunks[filename] = build_file_chunks(filename)
             continue
-            
-        # Разделяем строку на ячейки
-        cells = [cell.strip() for cell in line.split("|")[1:-1]]
-        
-        # Создаем чанк для каждой непустой ячейки
-        for i, cell in enumerate(cells):
-            if not cell:
-                continue
-                
-            # Определяем категорию по позиции
-            categories = ["Учебный процесс", "Инфраструктура", "Студенческая жизнь", 
-                        "История и уникальность", "Международные возможности"]
-            category = categories[i] if i < len(categories) else "Другое"
-            
-            # Форматируем факт
-            fact = f"""Категория: {category}
-Факт: {cell}"""
-            
-            # Загружаем чанк
-            chunk_id = sdk.files.upload_bytes(
-                fact.encode(),
-                ttl_days=1,
-                expiration_policy="static",
-                mime_type="text/markdown"
-            )
-            chunks.append(chunk_id)
+        source = get_source_name(filename)
+        with open(filename, "r", encoding="utf-8") as f:
+            for dialog in iter_chat_dialogs(f):
+                dialog["source"] = source
+                dialogs.append(dialog)
     
-    return chunks
+    if dedup and dialogs:
+        dialogs = deduplicate_dialogs(dialogs)
+    
+    for filename in filenames:
+        if filename in chunks:
+            continue
+        source = get_source_name(filename)
+        file_dialogs = [dialog for dialog in dialogs if dialog["source"] == source]
+        chunks[filename] = pack_dialogs(file_dialogs, source)
+        print(f"{source}: {len(file_dialogs)} диалогов упаковано в {len(chunks[filename])} чанков")
+    return [chunks[filename] for filename in filenames]
+
+def deduplicate_dialogs(dialogs):
+    """Удаление почти одинаковых вопросов из диалогов чатов"""
+    start_time = time.time()
+    kept, removed = deduplicate(
+        dialogs,
+        text=lambda dialog: dialog["question"],
+        # Предпочитаем диалоги с ответом, затем самые свежие
+        rank=lambda dialog: (dialog["answered"], dialog["timestamp"] or datetime.min),
+    )
+    result = []
+    for dialog, size in kept:
+        if size > 1:
+            dialog = dict(dialog, popularity=size, text=f"Похожих вопросов в архиве: {size}\n{dialog['text']}")
+        result.append(dialog)
+    clusters = sum(1 for _, size in kept if size > 1)
+    print(f"Дедупликация: удалено {removed} из {len(dialogs)} диалогов "
+          f"({clusters} кластеров повторов) за {time.time() - start_time:.2f} сек")
+    return result
+
+def chunk_and_upload_file(filename):
+    """Разбиение файла на чанки и загрузка в облако"""
+    chunks = build_file_chunks(filename)
+    return upload_chunks(get_sdk(), [chunk["text"] for chunk in chunks], desc=f"Загрузка {os.path.basename(filename)}")
+
+def chunk_and_upload_facts(content):
+    """Разбиение файла с фактами на чанки и загрузка в облако"""
+    chunks = build_facts_chunks(io.StringIO(content))
+    return upload_chunks(get_sdk(), [chunk["text"] for chunk in chunks], desc="Загрузка фактов")
 
 def chunk_and_upload_docs(content):
     """Разбиение файла с документами на чанки и загрузка в облако"""
-    chunks = []
-    
-    # Пропускаем заголовок
-    lines = content.split("\n")
-    if lines[0].startswith("#"):
-        lines = lines[1:]
-    
-    # Пропускаем заголовок таблицы и разделитель
-    if lines[0].startswith("|"):
-        lines = lines[2:]
-    
-    # Обрабатываем каждую строку таблицы
-    for line in lines:
-        if not line.strip() or not line.startswith("|"):
-            continue
-            
-        # Разделяем строку на ячейки
-        cells = [cell.strip() for cell in line.split("|")[1:-1]]
-        if len(cells) >= 3:
-            keywords = cells[0].strip()
-            question = cells[1].strip()
-            answer = cells[2].strip()
-            
-            # Форматируем документ
-            doc = f"""Ключевые слова: {keywords}
-Вопрос: {question}
-Ответ: {answer}"""
-            
-            # Загружаем чанк
-            chunk_id = sdk.files.upload_bytes(
-                doc.encode(),
-                ttl_days=1,
-                expiration_policy="static",
-                mime_type="text/markdown"
-            )
-            chunks.append(chunk_id)
-    
-    return chunks
+    chunks = build_docs_chunks(io.StringIO(content))
+    return upload_chunks(get_sdk(), [chunk["text"] for chunk in chunks], desc="Загрузка документов")
 
 def chunk_and_upload_chats(content):
     """Разбиение файла с чатами на чанки и загрузка в облако"""
-    # Пропускаем заголовок и начало таблицы
-    lines = content.split("\n")
-    if lines[0].startswith("#"):
-        year = lines[0].strip("#").strip()
-        lines = lines[1:]
-    else:
-        year = "unknown"
-        
-    if lines[0].startswith("| Вопросы | Ответы |"):
-        lines = lines[2:]  # Пропускаем заголовок таблицы и разделитель
-    
-    # Разбиваем на диалоги
+    chunks = build_chats_chunks(io.StringIO(content))
+    return upload_chunks(get_sdk(), [chunk["text"] for chunk in chunks], desc="Загрузка чатов")
+
+def build_facts_chunks(lines, source=""):
+    """Разбиение таблицы фактов на чанки (по чанку на каждую непустую ячейку)"""
     chunks = []
-    
-    for line in lines:
-        if not line.strip():  # Пропускаем пустые строки
-            continue
-            
-        # Разделяем строку на вопрос и ответ
-        parts = line.split("|")
-        if len(parts) < 4:  # Пропускаем некорректные строки
-            continue
-            
-        # Извлекаем ID и дату из вопроса
-        question_parts = parts[1].strip().split("<br>")
-        if len(question_parts) > 1:
-            metadata = question_parts[0].strip()
-            question = question_parts[1].strip()
-        else:
-            metadata = ""
-            question = parts[1].strip()
-            
-        # Извлекаем ID и дату из ответа
-        answer_parts = parts[2].strip().split("<br>")
-        if len(answer_parts) > 1:
-            answer_metadata = answer_parts[0].strip()
-            answer = answer_parts[1].strip()
-        else:
-            answer_metadata = ""
-            answer = parts[2].strip()
+    for record in iter_facts(lines):
+        fact = f"""Категория: {record.category}
+Факт: {record.text}"""
+        chunks.append({"source": source, "row": record.row, "text": fact})
+    return chunks
+
+def build_docs_chunks(lines, source=""):
+    """Разбиение таблицы документа на чанки (по чанку на каждую строку)"""
+    chunks = []
+    for record in iter_docs(lines):
+        doc = f"""Ключевые слова: {record.keywords}
+Вопрос: {record.question}
+Ответ: {record.answer}"""
+        chunks.append({"source": source, "row": record.row, "text": doc})
+    return chunks
+
+def format_chat_messages(messages):
+    """Текст сообщений ячейки чата; заголовки всех сообщений, кроме первого, сохраняются в тексте"""
+    parts = [messages[0].text] if messages else []
+    parts += [f"{message.meta}\n{message.text}" for message in messages[1:]]
+    return "\n\n".join(parts)
+
+def iter_chat_dialogs(lines):
+    """Форматирование диалогов архива чата с определением темы"""
+    for record in iter_chats(lines):
+        question_meta = record.question[0].meta if record.question else ""
+        answer_meta = record.answer[0].meta if record.answer else ""
         
         # Форматируем диалог с метаданными
-        dialog = f"""Год: {year}
-Вопрос ({metadata}):
-{question}
+        dialog = f"""Вопрос ({question_meta}):
+{format_chat_messages(record.question)}
 
-Ответ ({answer_metadata}):
-{answer}"""
+Ответ ({answer_meta}):
+{format_chat_messages(record.answer)}"""
         
-        # Загружаем каждый диалог как отдельный чанк
-        chunk_id = sdk.files.upload_bytes(
-            dialog.encode(),
-            ttl_days=1,
-            expiration_policy="static",
-            mime_type="text/markdown"
-        )
-        chunks.append(chunk_id)
+        yield {
+            "year": record.year,
+            "topic": detect_topic(record.question_text + " " + record.answer_text),
+            "row": record.row,
+            "timestamp": record.question[0].timestamp if record.question else None,
+            "answered": record.answer_id is not None,
+            "question": record.question_text,
+            "popularity": 1,
+            "text": dialog,
+        }
+
+def build_chats_chunks(lines, source="", max_tokens=None):
+    """Разбиение архива чата на чанки: диалоги упаковываются по году и теме до бюджета токенов"""
+    dialogs = 0
+    
+    def counted(items):
+        nonlocal dialogs
+        for item in items:
+            dialogs += 1
+            yield item
     
+    chunks = pack_dialogs(counted(iter_chat_dialogs(lines)), source, max_tokens)
+    print(f"{source or 'Чаты'}: {dialogs} диалогов упаковано в {len(chunks)} чанков")
     return chunks
 
-def create_and_populate_search_index(chunks, index_name, batch_size=100):
+def get_index_type():
+    """Тип гибридного индекса с параметрами чанкования из конфигурации"""
+    from yandex_cloud_ml_sdk.search_indexes import (
+        StaticIndexChunkingStrategy,
+        HybridSearchIndexType,
+        ReciprocalRankFusionIndexCombinationStrategy,
+    )
+    
+    config = load_config()["chunking"]
+    return HybridSearchIndexType(
+        chunking_strategy=StaticIndexChunkingStrategy(
+            max_chunk_size_tokens=config["max_chunk_size_tokens"],
+            chunk_overlap_tokens=config["chunk_overlap_tokens"]
+        ),
+        combination_strategy=ReciprocalRankFusionIndexCombinationStrategy(),
+    )
+
+def create_and_populate_search_index(chunks, index_name, batch_size=None):
     """Создание поискового индекса и добавление чанков пакетами"""
     if not chunks:
         raise ValueError("No chunks provided for indexing")
     
-    print(f"\nСоздание поискового индекса...")
+    print("\nСоздание поискового индекса...")
+    pipeline = IndexPipeline(get_sdk(), index_type=get_index_type(), index_name=index_name, batch_size=batch_size)
+    for chunk in chunks:
+        pipeline.add(chunk)
+    return pipeline.finish()
+
+def add_files_to_index(index, files, batch_size=None):
+    """Добавление файлов в существующий индекс пакетами"""
+    pipeline = IndexPipeline(get_sdk(), index=index, index_name=index.id, batch_size=batch_size)
+    for file in files:
+        pipeline.add(file)
+    return pipeline.finish()
+
+def iter_manifest_uploads(chunks, manifest):
+    """Загрузка чанков с записью их файлов в манифест; ID файлов выдаются по мере загрузки"""
+    for i, file in iter_uploads(get_sdk(), [chunk["text"] for chunk in chunks], desc="Загрузка новых чанков"):
+        manifest.add(chunks[i], file.id)
+        yield file.id
+
+def extend_manifest_ttls(manifest, keys):
+    """Продление TTL ещё живых файлов чанков, чтобы при пересборке их не загружать заново"""
+    entries = {manifest.entries[key]["file_id"]: key for key in keys if manifest.is_alive(key)}
+    for file_id, expires_at in extend_file_ttls(get_sdk(), list(entries)).items():
+        manifest.set_expires_at(entries[file_id], expires_at)
+
+def sync_search_index(chunks, index_name, batch_size=None):
+    """
+    Инкрементальное обновление поискового индекса по локальному манифесту
     
-    # Создаем индекс с первым пакетом чанков (до batch_size)
-    initial_batch = chunks[:batch_size]
-    op = sdk.search_indexes.create_deferred(
-        initial_batch,
-        index_type=HybridSearchIndexType(
-            chunking_strategy=StaticIndexChunkingStrategy(
-                max_chunk_size_tokens=1000,
-                chunk_overlap_tokens=100
-            ),
-            combination_strategy=ReciprocalRankFusionIndexCombinationStrategy(),
-        ),
-    )
-    index = op.wait()
-    print(f"Индекс {index_name} создан с первым пакетом ({len(initial_batch)} чанков)!")
+    Новые чанки загружаются и добавляются в существующий индекс. Изменённая
+    строка меняет хеш чанка, то есть это удаление старого чанка плюс добавление
+    нового. SDK не позволяет удалить отдельный файл из индекса (у индекса есть
+    только add_files_deferred, list_files и get_file), поэтому при изменении
+    или исчезновении чанков индекс пересобирается, и получается новая версия.
+    Файлы, которые ещё живы, при этом не загружаются заново: их TTL продлевается
+    при каждой синхронизации. Заново загружаются только новые чанки и чанки,
+    чьи файлы облако уже удалило. Загрузка и индексация идут конвейером:
+    пакеты отправляются в индекс, пока остальные чанки ещё загружаются.
+    """
+    manifest = ChunkManifest()
+    added, removed = manifest.diff(chunks)
+    print(f"\nНовых или изменённых чанков: {len(added)}, исчезнувших: {len(removed)}")
+    
+    # Продлеваем TTL файлов, которые остаются в корпусе
+    current = {chunk_hash(chunk["text"]): chunk for chunk in chunks}
+    if not current:
+        raise ValueError("No chunks provided for indexing")
+    extend_manifest_ttls(manifest, list(current))
+    
+    if manifest.index_id and not removed:
+        index = get_sdk().search_indexes.get(manifest.index_id)
+        if not added:
+            manifest.save()
+            print(f"Индекс {manifest.index_id} актуален")
+            return index
+        
+        # Отправляем в индекс только дельту
+        pipeline = IndexPipeline(get_sdk(), index=index, index_name=index_name, batch_size=batch_size)
+        for file_id in iter_manifest_uploads(added, manifest):
+            pipeline.add(file_id)
+        pipeline.finish()
+        manifest.save()
+        print(f"Индекс {manifest.index_id} обновлён: добавлено {len(added)} чанков")
+        return index
     
-    # Добавляем оставшиеся чанки пакетами
-    for i in range(batch_size, len(chunks), batch_size):
-        batch = chunks[i:i + batch_size]
-        print(f"Добавление пакета {(i//batch_size) + 1} ({len(batch)} чанков)...")
-        op = index.add_files_deferred(batch)
-        op.wait()
-        print(f"Пакет {(i//batch_size) + 1} добавлен!")
+    # Удаляем файлы исчезнувших чанков
+    for key in removed:
+        entry = manifest.remove(key)
+        try:
+            get_sdk().files.get(entry["file_id"]).delete()
+        except Exception as e:
+            print(f"Не удалось удалить файл {entry['file_id']}: {e}")
     
-    print(f"Индекс {index_name} полностью заполнен!")
+    # Повторно загружаем только новые чанки и чанки с истёкшим TTL
+    alive = [manifest.entries[key]["file_id"] for key in current if manifest.is_alive(key)]
+    stale = [chunk for key, chunk in current.items() if not manifest.is_alive(key)]
+    print(f"Загрузка {len(stale)} чанков, переиспользование {len(alive)}")
+    
+    print("\nСоздание поискового индекса...")
+    pipeline = IndexPipeline(get_sdk(), index_type=get_index_type(), index_name=index_name, batch_size=batch_size)
+    for file_id in alive:
+        pipeline.add(file_id)
+    for file_id in iter_manifest_uploads(stale, manifest):
+        pipeline.add(file_id)
+    index = pipeline.finish()
+    
+    # Прежний индекс больше не совпадает с манифестом, а новый попадёт
+    # в манифест только после успешной публикации (publish_manifest_index)
+    manifest.index_id = None
+    manifest.save()
     return index
 
+def publish_manifest_index(index_id):
+    """Привязка манифеста к индексу, прошедшему прогрев и переключение"""
+    manifest = ChunkManifest()
+    if manifest.index_id != index_id:
+        manifest.index_id = index_id
+        manifest.save()
+
 def get_files():
     """Получение списка всех файлов для анализа"""
     project_root = os.path.dirname(os.path.dirname(os.path.dirname(__file__)))
@@ -253,7 +382,7 @@ def get_files():
             files.append(fn)
     return sorted(files)
 
-def analyze_files():
+def analyze_files(offline=False):
     """Анализ всех .md файлов в директориях data/chats и data/facts"""
     # Получаем путь к корню проекта
     project_root = os.path.dirname(os.path.dirname(os.path.dirname(__file__)))
@@ -263,43 +392,113 @@ def analyze_files():
     d = [
         {
             "File": fn,
-            "Tokens": get_token_count(fn),
+            "Tokens": get_token_count(fn, offline),
             "Chars": get_file_len(fn),
             "Category": os.path.basename(os.path.dirname(fn)),
         }
         for fn in glob(os.path.join(data_dir, "*", "*.md"))
         if os.path.isfile(fn)
     ]
+    # Пробный запуск ничего не пишет на диск: офлайн-оценки в кеш и не попадают
+    if not offline:
+        get_token_cache().save()
     return pd.DataFrame(d)
 
-if __name__ == "__main__":
+def write_chunk_manifest(chunks, path):
+    """Запись чанков с метаданными в JSONL без обращения к облаку"""
+    cache = get_token_cache()
+    with open(path, "w", encoding="utf-8") as f:
+        for chunk in chunks:
+            category = os.path.basename(os.path.dirname(chunk.get("source", "")))
+            record = {
+                "hash": chunk_hash(chunk["text"]),
+                "source": chunk.get("source", ""),
+                "row": chunk.get("row"),
+                "rows": chunk.get("rows", [chunk.get("row")]),
+                "year": chunk.get("year"),
+                "topic": chunk.get("topic"),
+                "popularity": chunk.get("popularity", 1),
+                "chars": len(chunk["text"]),
+                "tokens": cache.estimate(chunk["text"], category),
+                "text": chunk["text"],
+            }
+            f.write(json.dumps(record, ensure_ascii=False) + "\n")
+    print(f"\nМанифест {len(chunks)} чанков записан в {path}")
+
+def build_embedding_store(chunks, offline=False):
+    """Расчёт векторов чанков для локального поиска и запись хранилища на диск"""
+    from ..core.embeddings import get_embedder
+
+    try:
+        embedder = get_embedder(None if offline else get_sdk())
+    except ValueError as e:
+        print(f"\nХранилище векторов не построено: {e}")
+        return None
+    print("\nПостроение хранилища векторов...")
+    return write_embedding_store(chunks, embedder)
+
+def run_pipeline(dry_run=False, output=None):
+    """
+    Полный цикл: анализ файлов, чанкование и обновление поискового индекса
+    
+    В режиме dry_run облако не используется: токены оцениваются офлайн,
+    а чанки с метаданными записываются в JSONL-файл output (по умолчанию
+    chunks.jsonl в корне проекта). Кеш токенов и хранилище векторов
+    при этом не перезаписываются.
+    """
     # Вывод списка файлов
     print("\nСписок файлов для обработки:")
     for file in get_files():
         print(f"- {file}")
     
     # Анализ файлов
-    df = analyze_files()
+    df = analyze_files(offline=dry_run)
     if df.empty:
         print("\nФайлы не найдены. Проверьте пути к директориям data/chats и data/facts.")
-    else:
-        print("\nРезультаты анализа файлов:")
-        print(df)
-        print(df.groupby("Category").agg({"Tokens": ("min", "mean", "max")}))
-        
-        # Загрузка файлов в облако с чанкованием
-        print("\nЗагрузка файлов в облако с чанкованием...")
-        df["Uploaded"] = df["File"].apply(chunk_and_upload_file)
-        print("\nЗагруженные чанки:")
-        for _, row in df.iterrows():
-            print(f"- {row['File']} -> {len(row['Uploaded'])} чанков")
-        print("Файлы загружены!")
-        
-        # Создание и заполнение индекса
-        all_chunks = df["Uploaded"].explode().tolist()
-        index = create_and_populate_search_index(all_chunks, f"index_1")
-        
-        # Сохранение ID индекса в .env
-        env_file = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(__file__))), ".env")
-        set_key(env_file, "SEARCH_INDEX_ID", index.id)
-        print("\nID индекса сохранён в .env")
\ No newline at end of file
+        return None
+    
+    print("\nРезультаты анализа файлов:")
+    print(df)
+    print(df.groupby("Category").agg({"Tokens": ("min", "mean", "max")}))
+    
+    # Чанкование файлов
+    print("\nЧанкование файлов...")
+    df["Chunks"] = build_corpus_chunks(df["File"].tolist())
+    for _, row in df.iterrows():
+        print(f"- {row['File']} -> {len(row['Chunks'])} чанков")
+    rows = sum(len(chunk.get("rows", [chunk["row"]])) for chunks in df["Chunks"] for chunk in chunks)
+    print(f"Всего строк: {rows}, файлов для загрузки после упаковки: {df['Chunks'].apply(len).sum()}")
+    all_chunks = df["Chunks"].explode().dropna().tolist()
+    
+    if dry_run:
+        write_chunk_manifest(all_chunks, output or resolve_project_path("chunks.jsonl"))
+        return None
+    
+    build_embedding_store(all_chunks)
+    
+    # Загрузка изменившихся чанков и обновление индекса
+    index = sync_search_index(all_chunks, "index_1")
+    
+    # Регистрация версии, прогрев и переключение работающих ботов на новый индекс
+    if not publish_index(get_sdk(), index, [chunk_hash(chunk["text"]) for chunk in all_chunks], "index_1"):
+        print("\nНовый индекс не прошёл проверку, активной остаётся прежняя версия")
+        return index
+    publish_manifest_index(index.id)
+    
+    # Сохранение ID индекса в .env (для запуска без реестра)
+    env_file = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(__file__))), ".env")
+    set_key(env_file, "SEARCH_INDEX_ID", index.id)
+    print("\nID индекса сохранён в .env")
+    return index
+
+def main():
+    parser = argparse.ArgumentParser(description="Чанкование данных и обновление поискового индекса")
+    parser.add_argument("--dry-run", action="store_true",
+                        help="разобрать и разбить файлы на чанки без обращения к облаку")
+    parser.add_argument("--output", default=None,
+                        help="файл JSONL для манифеста чанков в режиме --dry-run (по умолчанию chunks.jsonl в корне проекта)")
+    args = parser.parse_args()
+    run_pipeline(dry_run=args.dry_run, output=args.output)
+
+if __name__ == "__main__":
+    main()
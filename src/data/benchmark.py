@@ -0,0 +1,282 @@
+"""
+Модуль для замера производительности загрузки данных без обращения к облаку
+"""
+
+from datetime import datetime, timedelta
+from typing import Optional
+import argparse
+import itertools
+import json
+import os
+import random
+import tempfile
+import threading
+import time
+import sys
+import tracemalloc
+
+def get_peak_memory_mb() -> float:
+    """Пиковое потребление памяти процессом (на Windows - только объекты Python через tracemalloc)"""
+    try:
+        import resource
+    except ImportError:
+        return tracemalloc.get_traced_memory()[1] / 1024 / 1024
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux возвращает килобайты, macOS - байты
+    return peak / 1024 / 1024 if sys.platform == "darwin" else peak / 1024
+
+class FakeOperationStatus:
+    """Статус отложенной операции"""
+    def __init__(self, is_running: bool):
+        self.is_running = is_running
+
+class FakeOperation:
+    """Отложенная операция, завершающаяся через заданное время"""
+    def __init__(self, result, latency: float):
+        self.result = result
+        self.done_at = time.time() + latency
+
+    def get_status(self):
+        return FakeOperationStatus(time.time() < self.done_at)
+
+    def wait(self):
+        delay = self.done_at - time.time()
+        if delay > 0:
+            time.sleep(delay)
+        return self.result
+
+class FakeFile:
+    """Загруженный файл"""
+    def __init__(self, file_id: str):
+        self.id = file_id
+
+    def delete(self):
+        pass
+
+    def update(self, ttl_days: int = 1, **kwargs):
+        self.expires_at = datetime.now() + timedelta(days=ttl_days)
+        return self
+
+class FakeFiles:
+    """Замена sdk.files с настраиваемой задержкой и долей ошибок"""
+    def __init__(self, latency: float, error_rate: float):
+        self.latency = latency
+        self.error_rate = error_rate
+        self.ids = itertools.count()
+        self.lock = threading.Lock()
+        self.uploads = 0
+        self.errors = 0
+        # Начало первой и конец последней загрузки: загрузка идёт параллельно
+        # с операциями индекса, поэтому её длительность замеряется здесь
+        self.started_at = None
+        self.finished_at = None
+
+    @property
+    def upload_seconds(self) -> float:
+        """Длительность фазы загрузки файлов"""
+        if self.started_at is None:
+            return 0.0
+        return self.finished_at - self.started_at
+
+    def upload_bytes(self, data: bytes, **kwargs):
+        with self.lock:
+            if self.started_at is None:
+                self.started_at = time.time()
+        time.sleep(self.latency)
+        with self.lock:
+            self.finished_at = time.time()
+            if random.random() < self.error_rate:
+                self.errors += 1
+                raise ConnectionError("Имитация сетевой ошибки")
+            self.uploads += 1
+            return FakeFile(f"file-{next(self.ids)}")
+
+    def get(self, file_id: str):
+        return FakeFile(file_id)
+
+class FakeSearchIndex:
+    """Поисковый индекс, принимающий файлы пакетами"""
+    def __init__(self, index_id: str, latency: float):
+        self.id = index_id
+        self.latency = latency
+        self.files = []
+
+    def add_files_deferred(self, files):
+        self.files.extend(files)
+        return FakeOperation(self, self.latency)
+
+class FakeSearchIndexes:
+    """Замена sdk.search_indexes"""
+    def __init__(self, latency: float):
+        self.latency = latency
+        self.indexes = {}
+        self.ids = itertools.count()
+
+    def create_deferred(self, files, **kwargs):
+        index = FakeSearchIndex(f"index-{next(self.ids)}", self.latency)
+        index.files.extend(files)
+        self.indexes[index.id] = index
+        return FakeOperation(index, self.latency)
+
+    def get(self, index_id: str):
+        return self.indexes[index_id]
+
+class FakeModel:
+    """Модель с токенизацией по оценке 2 символа на токен"""
+    def tokenize(self, text: str):
+        return [None] * (len(text) // 2 + 1)
+
+class FakeModels:
+    def completions(self, *args, **kwargs):
+        return FakeModel()
+
+class FakeSDK:
+    """Замена SDK для замеров: files, search_indexes и models работают в памяти процесса"""
+    def __init__(self, upload_latency: float = 0.05, index_latency: float = 0.5, error_rate: float = 0.0):
+        self.files = FakeFiles(upload_latency, error_rate)
+        self.search_indexes = FakeSearchIndexes(index_latency)
+        self.models = FakeModels()
+
+def run_benchmark(
+    upload_latency: float = 0.05,
+    index_latency: float = 0.5,
+    error_rate: float = 0.0,
+    workers: Optional[int] = None,
+    dedup: Optional[bool] = None
+) -> dict:
+    """
+    Полный цикл загрузки данных на FakeSDK
+
+    Манифест и кеш токенов пишутся во временную директорию, поэтому каждый запуск
+    выполняет полную сборку индекса и не затрагивает рабочие файлы. Переменные
+    окружения и SDK модуля загрузки после замера восстанавливаются.
+    """
+    env = {"UPLOAD_BACKOFF": "0.01"}
+    if workers:
+        env["UPLOAD_MAX_WORKERS"] = str(workers)
+
+    from . import analyze_files as pipeline
+
+    sdk = FakeSDK(upload_latency, index_latency, error_rate)
+    previous_sdk = pipeline.sdk
+    previous_env = {key: os.environ.get(key) for key in ("CHUNK_MANIFEST_PATH", "TOKEN_CACHE_PATH", *env)}
+    with tempfile.TemporaryDirectory(prefix="ingest_benchmark_") as tmp_dir:
+        env["CHUNK_MANIFEST_PATH"] = os.path.join(tmp_dir, "chunk_manifest.json")
+        env["TOKEN_CACHE_PATH"] = os.path.join(tmp_dir, "token_cache.json")
+        os.environ.update(env)
+        pipeline.set_sdk(sdk)
+        try:
+            if os.name == "nt":
+                tracemalloc.start()
+            start_time = time.time()
+
+            files = pipeline.get_files()
+            pipeline.analyze_files()
+
+            parse_start = time.time()
+            chunks = pipeline.build_corpus_chunks(files, dedup)
+            parse_seconds = time.time() - parse_start
+            all_chunks = [chunk for file_chunks in chunks for chunk in file_chunks]
+            rows = sum(len(chunk.get("rows", [chunk["row"]])) for chunk in all_chunks)
+
+            index_start = time.time()
+            # Чанки, не загруженные после всех повторов, прерывают сборку индекса;
+            # замер при этом не теряется, а неудача попадает в отчёт
+            index, failure = None, None
+            try:
+                index = pipeline.sync_search_index(all_chunks, "benchmark")
+            except RuntimeError as e:
+                failure = str(e)
+                print(f"\nСборка индекса прервана: {e}")
+            index_seconds = time.time() - index_start
+
+            wall_seconds = time.time() - start_time
+            peak_memory_mb = get_peak_memory_mb()
+            tracemalloc.stop()
+            max_workers = pipeline.load_config()["upload"]["max_workers"]
+        finally:
+            # Рабочие настройки и SDK процесса возвращаются как были
+            for key, value in previous_env.items():
+                if value is None:
+                    os.environ.pop(key, None)
+                else:
+                    os.environ[key] = value
+            pipeline.set_sdk(previous_sdk)
+
+    return {
+        "timestamp": datetime.now().isoformat(),
+        "params": {
+            "upload_latency": upload_latency,
+            "index_latency": index_latency,
+            "error_rate": error_rate,
+            "workers": max_workers,
+        },
+        "files": len(files),
+        "rows": rows,
+        "rows_per_sec": rows / max(parse_seconds, 1e-9),
+        "chunks": len(all_chunks),
+        "uploads": sdk.files.uploads,
+        "upload_errors": sdk.files.errors,
+        "failed_chunks": max(len(all_chunks) - sdk.files.uploads, 0),
+        "failure": failure,
+        "uploads_per_sec": sdk.files.uploads / max(sdk.files.upload_seconds, 1e-9),
+        "upload_seconds": sdk.files.upload_seconds,
+        "indexed_files": len(index.files) if index else 0,
+        "index_seconds": index_seconds,
+        "wall_seconds": wall_seconds,
+        "peak_memory_mb": peak_memory_mb,
+    }
+
+def print_report(result: dict, baseline: Optional[dict] = None):
+    """Вывод результатов и сравнение с базовым запуском"""
+    metrics = [
+        ("rows_per_sec", "Разбор, строк/сек"),
+        ("uploads_per_sec", "Загрузка, файлов/сек"),
+        ("upload_seconds", "Загрузка, сек"),
+        ("index_seconds", "Загрузка и индексация, сек"),
+        ("wall_seconds", "Общее время, сек"),
+        ("peak_memory_mb", "Пиковая память, МБ"),
+    ]
+    print("\nРезультаты замера:")
+    print(f"Строк: {result['rows']}, чанков: {result['chunks']}, загрузок: {result['uploads']}, "
+          f"ошибок загрузки: {result['upload_errors']}, не загружено чанков: {result.get('failed_chunks', 0)}")
+    if result.get("failure"):
+        print(f"Индекс не собран: {result['failure']}")
+    for key, title in metrics:
+        line = f"- {title}: {result[key]:.2f}"
+        if baseline and baseline.get(key):
+            change = (result[key] - baseline[key]) / baseline[key] * 100
+            line += f" (база: {baseline[key]:.2f}, {change:+.1f}%)"
+        print(line)
+
+def main():
+    parser = argparse.ArgumentParser(description="Замер производительности загрузки данных на имитации SDK")
+    parser.add_argument("--upload-latency", type=float, default=0.05, help="задержка загрузки файла, сек")
+    parser.add_argument("--index-latency", type=float, default=0.5, help="длительность операции индекса, сек")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="доля неудачных загрузок")
+    parser.add_argument("--workers", type=int, default=None, help="число потоков загрузки")
+    parser.add_argument("--no-dedup", action="store_true", help="отключить дедупликацию диалогов")
+    parser.add_argument("--output", default="ingest_benchmark.json", help="файл для сохранения результата")
+    parser.add_argument("--baseline", default=None, help="файл с результатом для сравнения")
+    args = parser.parse_args()
+
+    result = run_benchmark(
+        upload_latency=args.upload_latency,
+        index_latency=args.index_latency,
+        error_rate=args.error_rate,
+        workers=args.workers,
+        dedup=False if args.no_dedup else None,
+    )
+
+    baseline = None
+    if args.baseline and os.path.exists(args.baseline):
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+    print_report(result, baseline)
+
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(result, f, ensure_ascii=False, indent=4)
+    print(f"\nРезультат сохранён в {args.output}")
+
+if __name__ == "__main__":
+    main()
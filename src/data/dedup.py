@@ -0,0 +1,145 @@
+"""
+Модуль для поиска почти одинаковых вопросов (MinHash + LSH)
+"""
+
+from typing import Callable, Dict, FrozenSet, List, Optional, Sequence, Tuple
+from ..utils.config import load_config
+from ..core.query_normalizer import stem, stem_tokens
+import numpy as np
+import zlib
+
+# Простое число Мерсенна для универсального хеширования
+MERSENNE_PRIME = (1 << 31) - 1
+
+# Приветствия, вежливые слова, местоимения и служебные слова: перефразировки
+# одного вопроса отличаются в основном ими, и на смысл вопроса они не влияют
+STOP_WORDS = frozenset(stem(word) for word in """
+    а и в во на по с со к ко о об от до из за у для при про ли же бы вот ну да
+    это этот эта эти то так там тут уже еще или но тоже также просто
+    что если нет есть как быть будет делать
+    я мы вы ты он она они мне нам вам тебе меня нас вас его ее их мой ваш свой
+    здравствуйте добрый доброе день вечер утро привет подскажите пожалуйста
+    скажите спасибо извините можно ответьте вопрос вопросик
+""".split())
+
+def content_words(text: str) -> FrozenSet[str]:
+    """Основы значимых слов текста (без служебных и вежливых)"""
+    return frozenset(token for token in stem_tokens(text) if token not in STOP_WORDS)
+
+def shingle_hashes(words: FrozenSet[str]) -> np.ndarray:
+    """Хеши основ слов (словесные шинглы)"""
+    return np.fromiter((zlib.crc32(word.encode()) & MERSENNE_PRIME for word in words), dtype=np.uint64)
+
+def adds_qualifier(a: FrozenSet[str], b: FrozenSet[str]) -> bool:
+    """
+    Один вопрос - другой с уточнением ("обновление списков" и "обновление
+    списков на платное"): у таких вопросов разные ответы, и они не сливаются
+    """
+    return a != b and (a < b or b < a)
+
+class MinHasher:
+    """Вычисление MinHash-сигнатур на основе семейства хеш-функций (a * x + b) mod p"""
+
+    def __init__(self, num_perm: int = 64, seed: int = 1):
+        rng = np.random.RandomState(seed)
+        self.num_perm = num_perm
+        self.a = rng.randint(1, MERSENNE_PRIME, size=num_perm).astype(np.uint64)
+        self.b = rng.randint(0, MERSENNE_PRIME, size=num_perm).astype(np.uint64)
+
+    def signature(self, words: FrozenSet[str]) -> np.ndarray:
+        """MinHash-сигнатура множества слов"""
+        hashes = shingle_hashes(words)
+        return ((self.a[:, None] * hashes[None, :] + self.b[:, None]) % MERSENNE_PRIME).min(axis=1)
+
+class UnionFind:
+    """Система непересекающихся множеств для сборки кластеров"""
+
+    def __init__(self, size: int):
+        self.parent = list(range(size))
+
+    def find(self, i: int) -> int:
+        while self.parent[i] != i:
+            self.parent[i] = self.parent[self.parent[i]]
+            i = self.parent[i]
+        return i
+
+    def union(self, i: int, j: int):
+        self.parent[self.find(i)] = self.find(j)
+
+def find_clusters(
+    texts: Sequence[str],
+    threshold: Optional[float] = None,
+    num_perm: Optional[int] = None,
+    bands: Optional[int] = None,
+    min_words: Optional[int] = None
+) -> List[List[int]]:
+    """
+    Кластеризация почти одинаковых текстов
+
+    Тексты сравниваются по множествам основ значимых слов, поэтому перефразировки
+    с другим порядком слов, формами и приветствиями совпадают. Кандидаты находятся
+    через LSH по полосам сигнатуры, затем пара объединяется, если оценка
+    коэффициента Жаккара не ниже threshold и ни один текст не является другим
+    с уточнением (adds_qualifier). Тексты меньше чем из min_words значимых слов
+    не сравниваются - для них сходство ненадёжно.
+
+    Returns:
+        list: Кластеры (списки индексов), включая одиночные
+    """
+    config = load_config()["dedup"]
+    threshold = config["threshold"] if threshold is None else threshold
+    num_perm = num_perm or config["num_perm"]
+    bands = bands or config["bands"]
+    min_words = config["min_words"] if min_words is None else min_words
+    rows = num_perm // bands
+
+    hasher = MinHasher(num_perm)
+    words = [content_words(text) for text in texts]
+    candidates = [i for i in range(len(texts)) if len(words[i]) >= min_words]
+    signatures = {i: hasher.signature(words[i]) for i in candidates}
+
+    clusters = UnionFind(len(texts))
+    for band in range(bands):
+        buckets: Dict[bytes, List[int]] = {}
+        for i in candidates:
+            key = signatures[i][band * rows:(band + 1) * rows].tobytes()
+            buckets.setdefault(key, []).append(i)
+        for bucket in buckets.values():
+            for pos, i in enumerate(bucket):
+                for j in bucket[pos + 1:]:
+                    if clusters.find(i) == clusters.find(j):
+                        continue
+                    if adds_qualifier(words[i], words[j]):
+                        continue
+                    if np.mean(signatures[i] == signatures[j]) >= threshold:
+                        clusters.union(i, j)
+
+    groups: Dict[int, List[int]] = {}
+    for i in range(len(texts)):
+        groups.setdefault(clusters.find(i), []).append(i)
+    return list(groups.values())
+
+def deduplicate(
+    items: Sequence[dict],
+    text: Callable[[dict], str],
+    rank: Callable[[dict], tuple],
+    **kwargs
+) -> Tuple[List[Tuple[dict, int]], int]:
+    """
+    Удаление почти одинаковых элементов
+
+    Args:
+        items: Элементы (например, диалоги)
+        text: Функция получения сравниваемого текста
+        rank: Ключ выбора представителя кластера (остаётся элемент с максимальным ключом)
+
+    Returns:
+        tuple: (список пар (элемент, размер кластера) в исходном порядке, число удалённых)
+    """
+    clusters = find_clusters([text(item) for item in items], **kwargs)
+    kept = []
+    for cluster in clusters:
+        best = max(cluster, key=lambda i: rank(items[i]))
+        kept.append((best, len(cluster)))
+    kept.sort()
+    return [(items[i], size) for i, size in kept], len(items) - len(kept)
@@ -0,0 +1,184 @@
+"""
+Модуль для хранения векторов чанков на диске с отображением в память
+"""
+
+from datetime import datetime
+from typing import List, Optional
+from ..utils.config import load_config, resolve_project_path
+import hashlib
+import json
+import os
+import shutil
+import time
+import numpy as np
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+# Файлы сборки хранилища: матрица векторов, таблица чанков и описание
+VECTORS_FILE = "embeddings.npy"
+CHUNKS_FILE = "chunks.parquet"
+INFO_FILE = "store.json"
+# Указатель на текущую сборку в корне хранилища
+CURRENT_FILE = "CURRENT"
+
+CHUNKS_SCHEMA = pa.schema([
+    ("id", pa.int32()),
+    ("text", pa.string()),
+    ("metadata", pa.string()),
+])
+
+def get_store_path() -> str:
+    """Директория хранилища векторов из конфигурации"""
+    return resolve_project_path(load_config()["embedding_store"]["path"])
+
+def corpus_version(chunks: List[dict]) -> str:
+    """Версия корпуса - хеш текстов чанков в порядке следования"""
+    digest = hashlib.sha256()
+    for chunk in chunks:
+        digest.update(chunk["text"].encode())
+    return digest.hexdigest()[:12]
+
+def current_build(path: Optional[str] = None) -> Optional[str]:
+    """Имя текущей сборки хранилища из указателя (None, если хранилище не построено)"""
+    path = path or get_store_path()
+    try:
+        with open(os.path.join(path, CURRENT_FILE), "r", encoding="utf-8") as f:
+            return f.read().strip() or None
+    except FileNotFoundError:
+        return None
+
+def remove_old_builds(path: str, keep: int):
+    """
+    Удаление старых сборок, кроме текущей и keep последних
+
+    Сборка, которую ещё держит отображённой в память работающий процесс, на Windows
+    удалить нельзя - она пропускается и будет удалена при следующей сборке.
+    """
+    current = current_build(path)
+    builds = sorted(
+        name for name in os.listdir(path)
+        if name != current and os.path.isfile(os.path.join(path, name, INFO_FILE))
+    )
+    for name in builds[:max(len(builds) - keep, 0)]:
+        try:
+            shutil.rmtree(os.path.join(path, name))
+        except OSError as e:
+            print(f"Старая сборка хранилища {name} не удалена: {e}")
+
+def write_embedding_store(
+    chunks: List[dict],
+    embedder,
+    path: Optional[str] = None,
+    dtype: Optional[str] = None,
+    batch_size: int = 64
+) -> str:
+    """
+    Расчёт векторов чанков и запись хранилища
+
+    Векторы пишутся пакетами прямо в файл .npy, поэтому вся матрица не держится в памяти.
+    Каждая сборка пишется в отдельную директорию, а затем атомарно заменяется один
+    файл-указатель CURRENT: читатели видят либо прежнюю сборку целиком, либо новую,
+    и файлы, отображённые в память работающими процессами, не перезаписываются.
+
+    Returns:
+        str: Путь к директории новой сборки
+    """
+    config = load_config()["embedding_store"]
+    root = path or get_store_path()
+    dtype = np.dtype(dtype or config["dtype"])
+    version = corpus_version(chunks)
+    build = f"{datetime.now().strftime('%Y%m%d-%H%M%S-%f')}-{version}"
+    path = os.path.join(root, build)
+    os.makedirs(path)
+    start_time = time.time()
+
+    dim = embedder.embed_documents([chunks[0]["text"]]).shape[1] if chunks else 0
+    vectors = np.lib.format.open_memmap(os.path.join(path, VECTORS_FILE), mode="w+", dtype=dtype, shape=(len(chunks), dim))
+    for start in range(0, len(chunks), batch_size):
+        batch = chunks[start:start + batch_size]
+        vectors[start:start + len(batch)] = embedder.embed_documents([chunk["text"] for chunk in batch])
+    vectors.flush()
+    del vectors
+
+    table = pa.Table.from_pydict({
+        "id": list(range(len(chunks))),
+        "text": [chunk["text"] for chunk in chunks],
+        "metadata": [
+            json.dumps({key: value for key, value in chunk.items() if key != "text"}, ensure_ascii=False)
+            for chunk in chunks
+        ],
+    }, schema=CHUNKS_SCHEMA)
+    pq.write_table(table, os.path.join(path, CHUNKS_FILE), compression="zstd")
+
+    info = {
+        "count": len(chunks),
+        "dim": dim,
+        "dtype": dtype.name,
+        "embedder": embedder.name,
+        "version": version,
+        "created_at": datetime.now().isoformat(),
+    }
+    with open(os.path.join(path, INFO_FILE), "w", encoding="utf-8") as f:
+        json.dump(info, f, ensure_ascii=False, indent=4)
+
+    # Переключение на новую сборку - одна атомарная замена указателя
+    tmp_current = os.path.join(root, f"{CURRENT_FILE}.tmp")
+    with open(tmp_current, "w", encoding="utf-8") as f:
+        f.write(build)
+    os.replace(tmp_current, os.path.join(root, CURRENT_FILE))
+    remove_old_builds(root, config["keep"])
+    print(f"Хранилище векторов: {len(chunks)} x {dim} ({dtype.name}) записано в {path} "
+          f"за {time.time() - start_time:.2f} сек")
+    return path
+
+class EmbeddingStore:
+    """
+    Хранилище векторов, открытое только для чтения.
+    Матрица отображается в память (np.memmap): страницы читаются с диска по мере
+    обращения и разделяются всеми процессами бота через кеш ОС.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        with open(os.path.join(path, INFO_FILE), "r", encoding="utf-8") as f:
+            self.info = json.load(f)
+        self.vectors = np.load(os.path.join(path, VECTORS_FILE), mmap_mode="r")
+        if self.vectors.shape != (self.info["count"], self.info["dim"]):
+            raise ValueError(f"Хранилище {path} повреждено: размер матрицы {self.vectors.shape} "
+                             f"не совпадает с описанием ({self.info['count']}, {self.info['dim']})")
+        self.build = os.path.basename(os.path.normpath(path))
+        self._chunks = None
+
+    @classmethod
+    def open(cls, path: Optional[str] = None) -> Optional["EmbeddingStore"]:
+        """Открытие текущей сборки хранилища (None, если оно ещё не построено)"""
+        path = path or get_store_path()
+        build = current_build(path)
+        if build is None or not os.path.exists(os.path.join(path, build, INFO_FILE)):
+            return None
+        return cls(os.path.join(path, build))
+
+    @property
+    def embedder(self) -> str:
+        return self.info["embedder"]
+
+    @property
+    def version(self) -> str:
+        return self.info["version"]
+
+    def __len__(self) -> int:
+        return self.info["count"]
+
+    def chunks(self) -> List[dict]:
+        """Чанки с метаданными в порядке строк матрицы"""
+        if self._chunks is None:
+            table = pq.read_table(os.path.join(self.path, CHUNKS_FILE), memory_map=True)
+            self._chunks = [
+                {**json.loads(metadata), "text": text}
+                for text, metadata in zip(table.column("text").to_pylist(), table.column("metadata").to_pylist())
+            ]
+        return self._chunks
+
+    def get(self, chunk_id: int) -> dict:
+        """Чанк по номеру строки"""
+        return self.chunks()[chunk_id]
@@ -0,0 +1,92 @@
+"""
+Модуль для экспорта архива чатов в колоночный формат Parquet
+"""
+
+from glob import glob
+from typing import List, Optional
+from ..utils.config import resolve_project_path
+from .parser import iter_chats
+import argparse
+import os
+import time
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+# Схема набора данных: одна строка - одна пара вопрос-ответ
+CHATS_SCHEMA = pa.schema([
+    ("source", pa.string()),
+    ("row", pa.int32()),
+    ("year", pa.int16()),
+    ("question_id", pa.int32()),
+    ("answer_id", pa.int32()),
+    ("question_author", pa.string()),
+    ("answer_authors", pa.list_(pa.string())),
+    ("question_time", pa.timestamp("s")),
+    ("answer_time", pa.timestamp("s")),
+    ("question_ids", pa.list_(pa.int32())),
+    ("answer_ids", pa.list_(pa.int32())),
+    ("question", pa.string()),
+    ("answer", pa.string()),
+])
+
+def get_chat_files() -> List[str]:
+    """Архивы чатов из data/chats"""
+    return sorted(glob(os.path.join(resolve_project_path("data"), "chats", "*.md")))
+
+def chat_file_to_table(filename: str) -> pa.Table:
+    """Разбор одного архива чата в таблицу Arrow"""
+    source = os.path.relpath(filename, resolve_project_path("")).replace(os.sep, "/")
+    columns = {field.name: [] for field in CHATS_SCHEMA}
+    with open(filename, "r", encoding="utf-8") as f:
+        for record in iter_chats(f):
+            columns["source"].append(source)
+            columns["row"].append(record.row)
+            columns["year"].append(int(record.year) if record.year.isdigit() else None)
+            columns["question_id"].append(record.question_id)
+            columns["answer_id"].append(record.answer_id)
+            columns["question_author"].append(record.question[0].author if record.question else None)
+            columns["answer_authors"].append([message.author for message in record.answer if message.author])
+            columns["question_time"].append(record.question[0].timestamp if record.question else None)
+            columns["answer_time"].append(record.answer[0].timestamp if record.answer else None)
+            columns["question_ids"].append([message.id for message in record.question if message.id is not None])
+            columns["answer_ids"].append([message.id for message in record.answer if message.id is not None])
+            columns["question"].append(record.question_text)
+            columns["answer"].append(record.answer_text)
+    return pa.Table.from_pydict(columns, schema=CHATS_SCHEMA)
+
+def export_chats(output: str, files: Optional[List[str]] = None) -> int:
+    """
+    Экспорт архивов чатов в Parquet
+
+    Каждый архив записывается отдельной группой строк, поэтому в памяти
+    одновременно находится только один год.
+
+    Returns:
+        int: Количество записанных пар вопрос-ответ
+    """
+    files = files or get_chat_files()
+    start_time = time.time()
+    rows = 0
+    with pq.ParquetWriter(output, CHATS_SCHEMA, compression="zstd") as writer:
+        for filename in files:
+            table = chat_file_to_table(filename)
+            writer.write_table(table)
+            rows += table.num_rows
+    print(f"Экспортировано {rows} диалогов из {len(files)} файлов в {output} за {time.time() - start_time:.2f} сек")
+    return rows
+
+def load_chats(path: str, columns: Optional[List[str]] = None) -> pd.DataFrame:
+    """Загрузка экспортированного архива чатов (можно выбрать только нужные столбцы)"""
+    # Целочисленные столбцы с пропусками (ответ без ID) остаются целыми, а не float
+    return pd.read_parquet(path, columns=columns, dtype_backend="numpy_nullable")
+
+def main():
+    parser = argparse.ArgumentParser(description="Экспорт архива чатов в Parquet")
+    parser.add_argument("--output", default=resolve_project_path("chats.parquet"),
+                        help="путь к выходному файлу Parquet")
+    args = parser.parse_args()
+    export_chats(args.output)
+
+if __name__ == "__main__":
+    main()
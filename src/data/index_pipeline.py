@@ -0,0 +1,111 @@
+"""
+Модуль для конвейерного наполнения поискового индекса
+"""
+
+from typing import List, Optional
+from ..utils.config import load_config
+import logging
+import time
+
+# Инициализация логгера
+logger = logging.getLogger(__name__)
+
+class IndexPipeline:
+    """
+    Конвейер наполнения поискового индекса.
+
+    Файлы добавляются по одному по мере загрузки; как только набирается пакет,
+    он отправляется через add_files_deferred, не дожидаясь завершения предыдущих
+    операций. Одновременно выполняется не более max_in_flight операций,
+    их статус опрашивается совместно.
+    """
+
+    def __init__(
+        self,
+        sdk,
+        index=None,
+        index_type=None,
+        index_name: str = "index",
+        batch_size: Optional[int] = None,
+        max_in_flight: Optional[int] = None,
+        poll_interval: Optional[float] = None
+    ):
+        config = load_config()["search_index"]
+        self.sdk = sdk
+        self.index = index
+        self.index_type = index_type
+        self.index_name = index_name
+        self.batch_size = batch_size or config["batch_size"]
+        self.max_in_flight = max_in_flight or config["max_in_flight"]
+        self.poll_interval = poll_interval or config["poll_interval"]
+        self.buffer: List[str] = []
+        self.in_flight = []
+        self.timings = []
+        self.batches = 0
+        self.files = 0
+        self.start_time = time.time()
+
+    def add(self, file_id: str):
+        """Добавление файла; полный пакет сразу отправляется в индекс"""
+        self.buffer.append(file_id)
+        if len(self.buffer) >= self.batch_size:
+            self.submit()
+
+    def submit(self):
+        """Отправка накопленного пакета"""
+        if not self.buffer:
+            return
+        batch, self.buffer = self.buffer, []
+        self.batches += 1
+        self.files += len(batch)
+        started = time.time()
+
+        if self.index is None:
+            # Добавлять файлы можно только в созданный индекс, поэтому создание ждём сразу.
+            # Загрузка остальных чанков в это время продолжается в фоне.
+            print(f"Создание индекса {self.index_name} с первым пакетом ({len(batch)} чанков)...")
+            op = self.sdk.search_indexes.create_deferred(batch, index_type=self.index_type)
+            self.index = op.wait()
+            self.record(self.batches, len(batch), started)
+            return
+
+        # Ограничиваем число одновременных операций
+        while len(self.in_flight) >= self.max_in_flight:
+            self.poll(block=True)
+        op = self.index.add_files_deferred(batch)
+        self.in_flight.append((self.batches, len(batch), started, op))
+        logger.info(f"Пакет {self.batches} ({len(batch)} чанков) отправлен, в работе: {len(self.in_flight)}")
+
+    def poll(self, block: bool = False):
+        """Совместный опрос выполняющихся операций; при block=True ждём завершения хотя бы одной"""
+        while self.in_flight:
+            still_running = []
+            for batch_no, size, started, op in self.in_flight:
+                if op.get_status().is_running:
+                    still_running.append((batch_no, size, started, op))
+                else:
+                    # Операция завершена: wait() сразу вернёт результат или поднимет ошибку
+                    op.wait()
+                    self.record(batch_no, size, started)
+            finished = len(still_running) < len(self.in_flight)
+            self.in_flight = still_running
+            if finished or not block:
+                return
+            time.sleep(self.poll_interval)
+
+    def record(self, batch_no: int, size: int, started: float):
+        """Учёт времени выполнения пакета"""
+        elapsed = time.time() - started
+        self.timings.append({"batch": batch_no, "files": size, "seconds": elapsed})
+        print(f"Пакет {batch_no} ({size} чанков) проиндексирован за {elapsed:.2f} сек")
+
+    def finish(self):
+        """Отправка остатка и ожидание всех операций"""
+        self.submit()
+        while self.in_flight:
+            self.poll(block=True)
+        elapsed = time.time() - self.start_time
+        if self.files:
+            print(f"Индекс {self.index_name}: {self.files} файлов в {self.batches} пакетах за {elapsed:.2f} сек "
+                  f"(операций одновременно: до {self.max_in_flight})")
+        return self.index
@@ -0,0 +1,249 @@
+"""
+Модуль реестра версий поискового индекса с атомарным переключением активной версии
+"""
+
+from datetime import datetime
+from typing import Dict, List, Optional
+from ..utils.config import load_config
+from ..core.active_index import get_registry_path
+import argparse
+import hashlib
+import json
+import logging
+import os
+import time
+
+# Инициализация логгера
+logger = logging.getLogger(__name__)
+
+# Статусы версий индекса
+STATUS_READY = "ready"
+STATUS_ACTIVE = "active"
+STATUS_RETIRED = "retired"
+STATUS_FAILED = "failed"
+STATUS_DELETED = "deleted"
+
+def manifest_hash(chunk_hashes: List[str]) -> str:
+    """Хеш набора чанков, из которого построен индекс (порядок не важен)"""
+    digest = hashlib.sha256()
+    for key in sorted(chunk_hashes):
+        digest.update(key.encode())
+    return digest.hexdigest()[:16]
+
+class IndexRegistry:
+    """
+    Локальный реестр версий поискового индекса.
+
+    Хранит для каждого индекса время сборки, хеш манифеста чанков и статус,
+    а также указатели на активную и предыдущую версии. Файл реестра
+    перезаписывается атомарно, поэтому работающие боты видят либо старую,
+    либо новую активную версию, но не промежуточное состояние.
+    """
+
+    def __init__(self, path: Optional[str] = None):
+        self.path = path or get_registry_path()
+        self.active: Optional[str] = None
+        self.previous: Optional[str] = None
+        self.versions: Dict[str, dict] = {}
+        self.load()
+
+    def load(self):
+        """Загрузка реестра с диска"""
+        if os.path.exists(self.path):
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            self.active = data.get("active")
+            self.previous = data.get("previous")
+            self.versions = data.get("versions", {})
+
+    def save(self):
+        """Атомарное сохранение реестра на диск"""
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({
+                "active": self.active,
+                "previous": self.previous,
+                "versions": self.versions,
+            }, f, ensure_ascii=False, indent=4)
+        os.replace(tmp_path, self.path)
+
+    def register(self, index_id: str, chunks_hash: str, chunks: int, name: str = "") -> dict:
+        """
+        Регистрация собранного индекса (повторная регистрация обновляет запись)
+
+        Статусы failed и deleted повторная регистрация не сбрасывает: вернуть
+        такую версию в работу может только успешный прогрев.
+        """
+        entry = self.versions.get(index_id, {})
+        status = entry.get("status")
+        if status not in (STATUS_FAILED, STATUS_DELETED):
+            status = STATUS_ACTIVE if index_id == self.active else STATUS_READY
+        entry.update({
+            "id": index_id,
+            "name": name,
+            "built_at": datetime.now().isoformat(),
+            "manifest_hash": chunks_hash,
+            "chunks": chunks,
+            "status": status,
+        })
+        self.versions[index_id] = entry
+        self.save()
+        return entry
+
+    def set_status(self, index_id: str, status: str):
+        """Изменение статуса версии"""
+        self.versions[index_id]["status"] = status
+        self.save()
+
+    def activate(self, index_id: str):
+        """Переключение активной версии"""
+        if index_id not in self.versions:
+            raise ValueError(f"Индекс {index_id} не зарегистрирован")
+        if self.versions[index_id]["status"] in (STATUS_FAILED, STATUS_DELETED):
+            raise ValueError(f"Индекс {index_id} нельзя активировать: статус {self.versions[index_id]['status']}")
+        if index_id == self.active:
+            return
+        if self.active in self.versions:
+            self.versions[self.active]["status"] = STATUS_RETIRED
+        self.previous, self.active = self.active, index_id
+        self.versions[index_id]["status"] = STATUS_ACTIVE
+        self.versions[index_id]["activated_at"] = datetime.now().isoformat()
+        self.save()
+        print(f"Активная версия индекса: {index_id} (предыдущая: {self.previous})")
+
+    def rollback(self, sdk=None) -> str:
+        """Возврат к предыдущей версии (с SDK - после её прогрева и проверки)"""
+        if not self.previous or self.versions.get(self.previous, {}).get("status") == STATUS_DELETED:
+            raise ValueError("Нет предыдущей версии индекса для отката")
+        if sdk is not None and not warm_up(sdk, self.previous):
+            raise ValueError(f"Предыдущая версия {self.previous} не прошла прогрев, откат отменён")
+        self.activate(self.previous)
+        return self.active
+
+    def collect_garbage(self, sdk, keep: Optional[int] = None) -> List[str]:
+        """
+        Удаление старых индексов из облака
+
+        Активная и предыдущая версии не удаляются никогда, из остальных
+        сохраняются keep самых свежих. Файлы чанков не удаляются: их
+        переиспользуют новые версии индекса.
+        """
+        keep = load_config()["index_registry"]["keep"] if keep is None else keep
+        candidates = [
+            entry for entry in self.versions.values()
+            if entry["id"] not in (self.active, self.previous) and entry["status"] != STATUS_DELETED
+        ]
+        candidates.sort(key=lambda entry: entry["built_at"], reverse=True)
+        deleted = []
+        for entry in candidates[keep:]:
+            try:
+                sdk.search_indexes.get(entry["id"]).delete()
+            except Exception as e:
+                print(f"Не удалось удалить индекс {entry['id']}: {e}")
+                continue
+            entry["status"] = STATUS_DELETED
+            entry["deleted_at"] = datetime.now().isoformat()
+            deleted.append(entry["id"])
+        self.save()
+        print(f"Удалено старых индексов: {len(deleted)}")
+        return deleted
+
+def warm_up(sdk, index_id: str, queries: Optional[List[str]] = None) -> bool:
+    """
+    Прогрев и проверка нового индекса до переключения
+
+    Индекс запрашивается из облака и выполняет пробные запросы: ошибка
+    здесь оставляет активной прежнюю версию.
+    """
+    queries = queries or load_config()["index_registry"]["warmup_queries"]
+    start_time = time.time()
+    try:
+        index = sdk.search_indexes.get(index_id)
+        if hasattr(index, "search"):
+            for query in queries:
+                index.search(query=query, limit=1)
+    except Exception as e:
+        print(f"Прогрев индекса {index_id} не удался: {e}")
+        return False
+    print(f"Индекс {index_id} прогрет: {len(queries)} запросов за {time.time() - start_time:.2f} сек")
+    return True
+
+def publish_index(sdk, index, chunk_hashes: List[str], name: str = "") -> bool:
+    """
+    Регистрация, прогрев и переключение на новую версию индекса
+
+    Пересобранный индекс получает новый ID и переключается атомарно. Инкрементальная
+    синхронизация (только добавленные чанки) дописывает файлы в уже активный индекс:
+    работающие боты видят добавления по мере индексации, атомарного переключения
+    в этом случае нет. Изменённые и удалённые чанки всегда дают новую версию,
+    поэтому частично обновлённый индекс может только не содержать ещё части новых
+    чанков, но не отдаёт устаревших. Смена хеша манифеста меняет версию индекса
+    для кешей (get_active_index_version), и они сбрасываются.
+    """
+    registry = IndexRegistry()
+    previous_hash = registry.versions.get(index.id, {}).get("manifest_hash")
+    registry.register(index.id, manifest_hash(chunk_hashes), len(chunk_hashes), name)
+    if index.id == registry.active:
+        if previous_hash != registry.versions[index.id]["manifest_hash"]:
+            print(f"Активный индекс {index.id} дополнен на месте, без переключения версии")
+            if not warm_up(sdk, index.id):
+                print(f"Внимание: активный индекс {index.id} не прошёл проверку после дополнения")
+                return False
+        else:
+            print(f"Индекс {index.id} уже активен")
+        return True
+    if not warm_up(sdk, index.id):
+        registry.set_status(index.id, STATUS_FAILED)
+        return False
+    if registry.versions[index.id]["status"] == STATUS_FAILED:
+        registry.set_status(index.id, STATUS_READY)
+    registry.activate(index.id)
+    return True
+
+def main():
+    parser = argparse.ArgumentParser(description="Управление версиями поискового индекса")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    subparsers.add_parser("list", help="список версий")
+    activate_parser = subparsers.add_parser("activate", help="переключение на версию")
+    activate_parser.add_argument("index_id")
+    activate_parser.add_argument("--no-warmup", action="store_true", help="переключить без прогрева")
+    rollback_parser = subparsers.add_parser("rollback", help="возврат к предыдущей версии")
+    rollback_parser.add_argument("--no-warmup", action="store_true", help="откатить без прогрева")
+    gc_parser = subparsers.add_parser("gc", help="удаление старых индексов из облака")
+    gc_parser.add_argument("--keep", type=int, default=None, help="сколько неактивных версий сохранить")
+    args = parser.parse_args()
+
+    registry = IndexRegistry()
+    if args.command == "list":
+        for entry in sorted(registry.versions.values(), key=lambda entry: entry["built_at"]):
+            marker = "*" if entry["id"] == registry.active else " "
+            print(f"{marker} {entry['id']}  {entry['built_at']}  {entry['status']:<8} "
+                  f"чанков: {entry['chunks']}  манифест: {entry['manifest_hash']}")
+        return
+
+    from ..utils.sdk_init import initialize_sdk
+
+    sdk = initialize_sdk()
+    if args.command == "rollback":
+        try:
+            registry.rollback(None if args.no_warmup else sdk)
+        except ValueError as e:
+            print(e)
+        return
+
+    if args.command == "activate":
+        if not args.no_warmup and not warm_up(sdk, args.index_id):
+            return
+        if args.index_id not in registry.versions:
+            # Индекс собран вне этого реестра (например, указан в SEARCH_INDEX_ID)
+            print(f"Индекс {args.index_id} не был зарегистрирован, регистрируем без манифеста")
+            registry.register(args.index_id, "", 0, "manual")
+        try:
+            registry.activate(args.index_id)
+        except ValueError as e:
+            print(e)
+    elif args.command == "gc":
+        registry.collect_garbage(sdk, args.keep)
+
+if __name__ == "__main__":
+    main()
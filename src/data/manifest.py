@@ -0,0 +1,102 @@
+"""
+Модуль для локального манифеста загруженных чанков
+"""
+
+from typing import Dict, List, Optional, Tuple
+from datetime import datetime, timedelta
+from ..utils.config import load_config, resolve_project_path
+import hashlib
+import json
+import os
+
+def chunk_hash(text: str) -> str:
+    """Хеш содержимого чанка"""
+    return hashlib.sha256(text.encode()).hexdigest()
+
+def get_manifest_path() -> str:
+    """Путь к файлу манифеста (относительные пути считаются от корня проекта)"""
+    return resolve_project_path(load_config()["search_index"]["manifest_path"])
+
+class ChunkManifest:
+    """
+    Манифест чанков: хеш чанка -> ID файла в облаке, источник и строка.
+    Позволяет при повторной индексации загружать только новые и изменённые чанки.
+    """
+
+    def __init__(self, path: Optional[str] = None):
+        self.path = path or get_manifest_path()
+        self.index_id = None
+        self.entries: Dict[str, dict] = {}
+        self.load()
+
+    def load(self):
+        """Загрузка манифеста с диска"""
+        if not os.path.exists(self.path):
+            return
+        with open(self.path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        self.index_id = data.get("index_id")
+        self.entries = data.get("chunks", {})
+
+    def save(self):
+        """Атомарное сохранение манифеста на диск"""
+        data = {
+            "index_id": self.index_id,
+            "updated_at": datetime.now().isoformat(),
+            "chunks": self.entries,
+        }
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(data, f, ensure_ascii=False, indent=1)
+        os.replace(tmp_path, self.path)
+
+    def is_alive(self, key: str) -> bool:
+        """Проверка, что файл чанка ещё не удалён облаком по TTL"""
+        entry = self.entries.get(key)
+        if not entry:
+            return False
+        expires_at = entry.get("expires_at")
+        return expires_at is None or datetime.fromisoformat(expires_at) > datetime.now()
+
+    def diff(self, chunks: List[dict]) -> Tuple[List[dict], List[str]]:
+        """
+        Сравнение текущих чанков с манифестом
+
+        Returns:
+            tuple: (новые или изменённые чанки, хеши исчезнувших чанков)
+        """
+        current = {chunk_hash(chunk["text"]): chunk for chunk in chunks}
+        added = [chunk for key, chunk in current.items() if key not in self.entries]
+        removed = [key for key in self.entries if key not in current]
+        return added, removed
+
+    def add(self, chunk: dict, file_id: str):
+        """Запись загруженного чанка в манифест"""
+        ttl_days = load_config()["upload"]["ttl_days"]
+        now = datetime.now()
+        self.entries[chunk_hash(chunk["text"])] = {
+            "file_id": file_id,
+            "source": chunk.get("source", ""),
+            "row": chunk.get("row"),
+            "rows": chunk.get("rows", [chunk.get("row")]),
+            "uploaded_at": now.isoformat(),
+            "expires_at": (now + timedelta(days=ttl_days)).isoformat(),
+        }
+
+    def set_expires_at(self, key: str, expires_at: Optional[datetime]):
+        """
+        Обновление времени истечения файла чанка после продления TTL
+
+        None означает, что файл продлить не удалось и он считается истёкшим.
+        """
+        entry = self.entries.get(key)
+        if entry is not None:
+            entry["expires_at"] = (expires_at or datetime.min).isoformat()
+
+    def remove(self, key: str) -> Optional[dict]:
+        """Удаление чанка из манифеста"""
+        return self.entries.pop(key, None)
+
+    def file_ids(self) -> List[str]:
+        """ID файлов всех чанков манифеста"""
+        return [entry["file_id"] for entry in self.entries.values()]
@@ -0,0 +1,90 @@
+"""
+Модуль для упаковки диалогов из чатов в чанки с ограничением по токенам
+"""
+
+from typing import Dict, Iterable, List, Optional
+from ..utils.config import load_config
+from .token_cache import get_token_cache
+
+# Темы диалогов и ключевые слова (основы слов в нижнем регистре)
+TOPIC_KEYWORDS = {
+    "Общежитие": ["общежит", "общаг", "заселен", "комнат"],
+    "Военный учебный центр": ["вуц", "военн", "офицер", "сержант"],
+    "Целевое обучение": ["целев", "заказчик"],
+    "Баллы и конкурс": ["балл", "конкурс", "рейтинг", "проходн", "приоритет", "крылов"],
+    "Документы и заявления": ["документ", "оригинал", "заявлен", "согласи", "госуслуг", "справк"],
+    "Олимпиады и достижения": ["олимпиад", "достижен", "гто", "бви", "портфолио"],
+    "Платное обучение": ["платн", "стоимост", "оплат", "договор", "скидк"],
+    "Экзамены": ["экзамен", "егэ", "вступительн", "испытан", "внутренн"],
+}
+DEFAULT_TOPIC = "Другое"
+DIALOG_SEPARATOR = "\n\n---\n\n"
+
+def detect_topic(text: str) -> str:
+    """Определение темы диалога по количеству совпадений ключевых слов"""
+    text = text.lower()
+    best_topic, best_hits = DEFAULT_TOPIC, 0
+    for topic, keywords in TOPIC_KEYWORDS.items():
+        hits = sum(text.count(keyword) for keyword in keywords)
+        if hits > best_hits:
+            best_topic, best_hits = topic, hits
+    return best_topic
+
+def estimate_tokens(text: str, chars_per_token: Optional[float] = None) -> int:
+    """Оценка количества токенов по числу символов (соотношение калибруется по кешу токенов)"""
+    chars_per_token = chars_per_token or get_token_cache().chars_per_token()
+    return int(len(text) / chars_per_token) + 1
+
+def pack_dialogs(dialogs: Iterable[dict], source: str = "", max_tokens: Optional[int] = None) -> List[dict]:
+    """
+    Упаковка диалогов в чанки размером до max_tokens
+
+    Диалоги группируются по году и теме с сохранением исходного порядка внутри группы.
+    Диалог, который сам превышает бюджет, становится отдельным чанком.
+
+    Args:
+        dialogs: Словари с ключами year, topic, row и text
+        source: Источник для метаданных чанка
+        max_tokens: Бюджет токенов на чанк (по умолчанию max_chunk_size_tokens индекса)
+
+    Returns:
+        list: Чанки с ключами source, row, rows, year, topic, popularity и text
+    """
+    max_tokens = max_tokens or load_config()["chunking"]["max_chunk_size_tokens"]
+    chars_per_token = get_token_cache().chars_per_token("chats")
+    groups: Dict[tuple, List[dict]] = {}
+    chunks = []
+
+    def flush(key):
+        group = groups.pop(key, None)
+        if not group:
+            return
+        year, topic = key
+        header = f"Год: {year}\nТема: {topic}"
+        chunks.append({
+            "source": source,
+            "row": group[0]["row"],
+            "rows": [dialog["row"] for dialog in group],
+            "year": year,
+            "topic": topic,
+            "popularity": sum(dialog.get("popularity", 1) for dialog in group),
+            "text": header + "\n\n" + DIALOG_SEPARATOR.join(dialog["text"] for dialog in group),
+        })
+
+    sizes: Dict[tuple, int] = {}
+    for dialog in dialogs:
+        key = (dialog["year"], dialog["topic"])
+        tokens = estimate_tokens(dialog["text"] + DIALOG_SEPARATOR, chars_per_token)
+        if key in groups and sizes[key] + tokens > max_tokens:
+            flush(key)
+        if key not in groups:
+            groups[key] = []
+            sizes[key] = estimate_tokens(f"Год: {key[0]}\nТема: {key[1]}\n\n", chars_per_token)
+        groups[key].append(dialog)
+        sizes[key] += tokens
+
+    for key in list(groups):
+        flush(key)
+
+    # Возвращаем чанки в порядке первой строки, чтобы результат был детерминированным
+    return sorted(chunks, key=lambda chunk: chunk["row"])
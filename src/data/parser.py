@@ -0,0 +1,192 @@
+"""
+Модуль для потокового разбора markdown-таблиц из директории data
+"""
+
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Iterable, Iterator, List, Optional, Tuple
+import re
+
+# Заголовок сообщения в чатах: **ID 2475** (Rinaz, 05.07.2024, 09:27:30)
+CHAT_HEADER_RE = re.compile(
+    r"\*\*ID (\d+)\*\* \((.+?), (\d{2}\.\d{2}\.\d{4}), (\d{2}:\d{2}:\d{2})[^)]*\)"
+)
+# Разделитель ячеек: неэкранированный символ |
+CELL_SEPARATOR_RE = re.compile(r"(?<!\\)\|")
+TABLE_DELIMITER_RE = re.compile(r"^\|[\s:|-]+\|$")
+YEAR_RE = re.compile(r"\d{4}")
+
+@dataclass(frozen=True)
+class ChatMessage:
+    """Сообщение из архива чата"""
+    id: Optional[int]
+    author: str
+    timestamp: Optional[datetime]
+    meta: str
+    text: str
+
+@dataclass(frozen=True)
+class ChatRecord:
+    """Пара вопрос-ответ из архива чата"""
+    year: str
+    row: int
+    question: Tuple[ChatMessage, ...]
+    answer: Tuple[ChatMessage, ...]
+
+    @property
+    def question_id(self) -> Optional[int]:
+        return self.question[0].id if self.question else None
+
+    @property
+    def answer_id(self) -> Optional[int]:
+        return self.answer[0].id if self.answer else None
+
+    @property
+    def question_text(self) -> str:
+        return "\n".join(message.text for message in self.question)
+
+    @property
+    def answer_text(self) -> str:
+        return "\n".join(message.text for message in self.answer)
+
+@dataclass(frozen=True)
+class DocRecord:
+    """Строка таблицы официального документа"""
+    title: str
+    row: int
+    keywords: str
+    question: str
+    answer: str
+
+@dataclass(frozen=True)
+class FactRecord:
+    """Факт о МАИ от студентов"""
+    row: int
+    category: str
+    text: str
+
+def split_cells(line: str) -> List[str]:
+    """Разделение строки таблицы на ячейки"""
+    body = line.strip()
+    if body.startswith("|"):
+        body = body[1:]
+    if body.endswith("|") and not body.endswith("\\|"):
+        body = body[:-1]
+    return [cell.strip() for cell in CELL_SEPARATOR_RE.split(body)]
+
+def iter_table_rows(lines: Iterable[str]) -> Iterator[Tuple[int, str, List[str], str]]:
+    """
+    Потоковое чтение строк markdown-таблиц
+
+    Args:
+        lines: Файловый объект или любой итератор строк
+
+    Yields:
+        tuple: (номер строки в файле, последний заголовок "#", названия столбцов, строка таблицы)
+    """
+    title = ""
+    header = None
+    for row, line in enumerate(lines, start=1):
+        line = line.rstrip("\r\n")
+        if line.startswith("#"):
+            title = line.strip("#").strip()
+            continue
+        if not line.startswith("|"):
+            # Любая строка вне таблицы завершает текущую таблицу
+            header = None
+            continue
+        if header is None:
+            header = split_cells(line)
+        elif TABLE_DELIMITER_RE.match(line.strip()):
+            continue
+        else:
+            yield row, title, header, line
+
+def parse_chat_cell(cell: str) -> Tuple[ChatMessage, ...]:
+    """Разбор ячейки чата на сообщения с ID, автором и временем"""
+    messages = []
+    matches = list(CHAT_HEADER_RE.finditer(cell))
+    if not matches or matches[0].start() > 0:
+        # Текст без заголовка (например, "Нет прямого ответа...")
+        end = matches[0].start() if matches else len(cell)
+        text = clean_text(cell[:end])
+        if text:
+            messages.append(ChatMessage(id=None, author="", timestamp=None, meta="", text=text))
+    for i, match in enumerate(matches):
+        end = matches[i + 1].start() if i + 1 < len(matches) else len(cell)
+        message_id, author, date, time = match.groups()
+        messages.append(ChatMessage(
+            id=int(message_id),
+            author=author.strip(),
+            timestamp=datetime.strptime(f"{date} {time}", "%d.%m.%Y %H:%M:%S"),
+            meta=match.group(0),
+            text=clean_text(cell[match.end():end]),
+        ))
+    return tuple(messages)
+
+def clean_text(text: str) -> str:
+    """Замена переносов <br> и обрезка пробелов"""
+    return "\n".join(part.strip() for part in text.split("<br>") if part.strip())
+
+def split_chat_row(line: str) -> Optional[Tuple[str, str]]:
+    """
+    Разделение строки чата на вопрос и ответ
+
+    Символ | может встречаться в имени автора и в тексте, поэтому разделителем
+    считается первый | вне заголовков сообщений, за которым начинается **ID,
+    а если ответ без заголовка - последний | вне заголовков.
+    """
+    body = line.strip()[1:]
+    if body.endswith("|"):
+        body = body[:-1]
+    spans = [match.span() for match in CHAT_HEADER_RE.finditer(body)]
+    separators = [
+        match.start() for match in CELL_SEPARATOR_RE.finditer(body)
+        if not any(start <= match.start() < end for start, end in spans)
+    ]
+    if not separators:
+        return None
+    for position in separators:
+        if body[position + 1:].lstrip().startswith("**ID"):
+            break
+    else:
+        position = separators[-1]
+    return body[:position].strip(), body[position + 1:].strip()
+
+def iter_chats(lines: Iterable[str]) -> Iterator[ChatRecord]:
+    """Потоковый разбор архива чата"""
+    for row, title, header, line in iter_table_rows(lines):
+        cells = split_chat_row(line)
+        if cells is None:
+            continue
+        year = YEAR_RE.search(title)
+        yield ChatRecord(
+            year=year.group(0) if year else "unknown",
+            row=row,
+            question=parse_chat_cell(cells[0]),
+            answer=parse_chat_cell(cells[1]),
+        )
+
+def iter_docs(lines: Iterable[str]) -> Iterator[DocRecord]:
+    """Потоковый разбор таблицы документа (ключевые слова, вопрос, ответ)"""
+    for row, title, header, line in iter_table_rows(lines):
+        cells = split_cells(line)
+        if len(cells) < 3:
+            continue
+        # Лишние ячейки появляются только из-за | в тексте ответа
+        yield DocRecord(
+            title=title,
+            row=row,
+            keywords=cells[0],
+            question=cells[1],
+            answer=" | ".join(cells[2:]),
+        )
+
+def iter_facts(lines: Iterable[str]) -> Iterator[FactRecord]:
+    """Потоковый разбор таблицы фактов, категория берётся из заголовка столбца"""
+    for row, title, header, line in iter_table_rows(lines):
+        for i, cell in enumerate(split_cells(line)):
+            if not cell:
+                continue
+            category = header[i] if i < len(header) else "Другое"
+            yield FactRecord(row=row, category=category, text=cell)
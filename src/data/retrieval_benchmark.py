@@ -0,0 +1,249 @@
+"""
+Модуль для замера качества и скорости поиска на вопросах из архива чатов
+"""
+
+from datetime import datetime
+from glob import glob
+from typing import List, Optional
+from ..utils.config import resolve_project_path
+from .parser import iter_chats
+import argparse
+import json
+import os
+import random
+import re
+import time
+import numpy as np
+
+SPACES_RE = re.compile(r"\s+")
+
+def normalize(text: str) -> str:
+    """Текст для сравнения: нижний регистр, ё/е, схлопнутые пробелы"""
+    return SPACES_RE.sub(" ", text.lower().replace("ё", "е")).strip()
+
+def load_gold_set(
+    sample: int = 200,
+    seed: int = 42,
+    min_question_chars: int = 30,
+    min_answer_chars: int = 20,
+    files: Optional[List[str]] = None,
+    chunks: Optional[List[dict]] = None
+) -> List[dict]:
+    """
+    Выборка пар вопрос - ответ сотрудника из архивов чатов
+
+    Если переданы чанки базы знаний, в выборку попадают только пары, строка
+    которых вошла в какой-либо чанк (повторы, удалённые дедупликацией, найти
+    нельзя, и они занижали бы полноту).
+
+    Returns:
+        list: Словари с полями question, answer, snippet (первое сообщение
+            ответа), year, source и row
+    """
+    covered = None
+    if chunks is not None:
+        covered = {
+            (chunk.get("source"), row)
+            for chunk in chunks
+            for row in chunk.get("rows", [chunk.get("row")])
+        }
+    files = files or sorted(glob(os.path.join(resolve_project_path("data"), "chats", "*.md")))
+    pairs = []
+    for filename in files:
+        source = os.path.relpath(filename, resolve_project_path("")).replace(os.sep, "/")
+        with open(filename, "r", encoding="utf-8") as f:
+            for record in iter_chats(f):
+                question, answer = record.question_text.strip(), record.answer_text.strip()
+                if len(question) < min_question_chars or len(answer) < min_answer_chars:
+                    continue
+                if covered is not None and (source, record.row) not in covered:
+                    continue
+                pairs.append({
+                    "question": question,
+                    "answer": answer,
+                    "snippet": record.answer[0].text.strip(),
+                    "year": record.year,
+                    "source": source,
+                    "row": record.row,
+                })
+    random.Random(seed).shuffle(pairs)
+    return pairs[:sample] if sample else pairs
+
+def is_relevant(result: dict, pair: dict, snippet_chars: int = 80) -> bool:
+    """
+    Результат релевантен, если это чанк с диалогом пары
+
+    Локальный поиск возвращает источник и строки чанка в метаданных; у облачного
+    их нет, и результат сверяется по началу первого сообщения ответа (весь ответ
+    в чанке разбит заголовками сообщений и целиком не встречается).
+    """
+    metadata = result.get("metadata") if isinstance(result.get("metadata"), dict) else {}
+    rows = metadata.get("rows") or ([metadata["row"]] if metadata.get("row") is not None else [])
+    if metadata.get("source") and rows:
+        return metadata["source"] == pair["source"] and pair["row"] in rows
+    return normalize(pair["snippet"])[:snippet_chars] in normalize(result.get("text", ""))
+
+def first_relevant_rank(results: List[dict], pair: dict) -> Optional[int]:
+    """Позиция (с 1) первого результата с диалогом пары или None"""
+    for rank, result in enumerate(results, start=1):
+        if is_relevant(result, pair):
+            return rank
+    return None
+
+def run_queries(sample: int, k: int, seed: int, score_threshold: float, batch: bool, cloud: bool) -> tuple:
+    """
+    Выполнение запросов выборки через бэкенд поиска из конфигурации
+
+    Returns:
+        tuple: Результаты в формате search_admissions_info_batch (с полем error),
+            выборка и общее время запросов в секундах
+    """
+    from ..core.sdk import search_admissions_info_batch, search_and_rerank, get_search_backend
+    from ..core.query_normalizer import prepare_query
+    from .analyze_files import build_corpus_chunks, get_files
+
+    sdk = None
+    if cloud:
+        from ..utils.sdk_init import initialize_sdk
+        sdk = initialize_sdk()
+
+    chunks = [chunk for file_chunks in build_corpus_chunks(get_files()) for chunk in file_chunks]
+    gold = load_gold_set(sample, seed, chunks=chunks)
+    queries = [pair["question"] for pair in gold]
+
+    # Построение локального индекса или получение облачного не входит в замер
+    backend = get_search_backend(sdk)
+    backend.search(queries[0] if queries else "", limit=1, score_threshold=0.0)
+
+    start_time = time.time()
+    if batch:
+        items = search_admissions_info_batch(sdk, queries, limit=k, score_threshold=score_threshold)
+    else:
+        # Те же шаги, что в search_admissions_info без кеша, но ошибка не подменяется пустым ответом
+        items = []
+        for query in queries:
+            query_start = time.time()
+            try:
+                results, error = search_and_rerank(backend, prepare_query(query), k, score_threshold), None
+            except Exception as e:
+                results, error = [], str(e)
+            items.append({"query": query, "results": results, "latency": time.time() - query_start, "error": error})
+    return items, gold, time.time() - start_time
+
+def run_benchmark(
+    backend: str = "local",
+    sample: int = 200,
+    k: int = 5,
+    seed: int = 42,
+    score_threshold: float = 0.0,
+    rerank: bool = True,
+    batch: bool = False
+) -> dict:
+    """
+    Прогон выборки через настроенный бэкенд поиска
+
+    Кеш результатов отключается, чтобы каждый запрос доходил до бэкенда.
+    Вопросы взяты из того же архива, что и база знаний, поэтому метрики
+    показывают, находит ли поиск нужный диалог, и годятся для сравнения
+    вариантов чанкования и ранжирования, а не как абсолютная оценка.
+    Переменные окружения после замера восстанавливаются.
+    """
+    env = {
+        "SEARCH_BACKEND": backend,
+        "SEARCH_CACHE_ENABLED": "0",
+        "RERANK_ENABLED": "1" if rerank else "0",
+    }
+    previous_env = {key: os.environ.get(key) for key in env}
+    os.environ.update(env)
+    try:
+        items, gold, wall_seconds = run_queries(sample, k, seed, score_threshold, batch, backend == "cloud")
+    finally:
+        # Настройки поиска процесса возвращаются как были
+        for key, value in previous_env.items():
+            if value is None:
+                os.environ.pop(key, None)
+            else:
+                os.environ[key] = value
+
+    # Ошибки бэкенда не считаются промахами: метрики качества и задержки
+    # считаются по успешным запросам, а ошибки выводятся отдельно
+    answered = [(item, pair) for item, pair in zip(items, gold) if not item.get("error")]
+    ranks = [first_relevant_rank(item["results"], pair) for item, pair in answered]
+    latencies = np.array([item["latency"] for item, _ in answered]) * 1000
+    recall = {
+        f"recall@{cutoff}": sum(1 for rank in ranks if rank and rank <= cutoff) / max(len(ranks), 1)
+        for cutoff in sorted({1, 3, k})
+    }
+
+    return {
+        "timestamp": datetime.now().isoformat(),
+        "params": {
+            "backend": backend,
+            "sample": len(gold),
+            "k": k,
+            "seed": seed,
+            "score_threshold": score_threshold,
+            "rerank": rerank,
+            "batch": batch,
+        },
+        **recall,
+        "mrr": sum(1 / rank for rank in ranks if rank) / max(len(ranks), 1),
+        "p50_ms": float(np.percentile(latencies, 50)) if len(latencies) else 0.0,
+        "p95_ms": float(np.percentile(latencies, 95)) if len(latencies) else 0.0,
+        "p99_ms": float(np.percentile(latencies, 99)) if len(latencies) else 0.0,
+        "queries_per_sec": len(items) / max(wall_seconds, 1e-9),
+        "errors": len(items) - len(answered),
+        "wall_seconds": wall_seconds,
+    }
+
+def print_report(result: dict, baseline: Optional[dict] = None):
+    """Вывод результатов и сравнение с базовым запуском"""
+    metrics = [key for key in result if key.startswith("recall@")] + [
+        "mrr", "p50_ms", "p95_ms", "p99_ms", "queries_per_sec",
+    ]
+    params = result["params"]
+    print(f"\nРезультаты замера поиска ({params['backend']}, {params['sample']} вопросов, k={params['k']}):")
+    if result.get("errors"):
+        print(f"- ошибок поиска: {result['errors']} (не входят в метрики)")
+    for key in metrics:
+        line = f"- {key}: {result[key]:.3f}"
+        if baseline and baseline.get(key):
+            change = (result[key] - baseline[key]) / baseline[key] * 100
+            line += f" (база: {baseline[key]:.3f}, {change:+.1f}%)"
+        print(line)
+
+def main():
+    parser = argparse.ArgumentParser(description="Замер качества и скорости поиска на вопросах из архива чатов")
+    parser.add_argument("--backend", choices=["local", "cloud"], default="local", help="бэкенд поиска")
+    parser.add_argument("--sample", type=int, default=200, help="число пар вопрос-ответ (0 - все)")
+    parser.add_argument("--k", type=int, default=5, help="число результатов на запрос")
+    parser.add_argument("--seed", type=int, default=42, help="зерно случайной выборки")
+    parser.add_argument("--score-threshold", type=float, default=0.0, help="порог оценки результатов")
+    parser.add_argument("--no-rerank", action="store_true", help="отключить переранжирование")
+    parser.add_argument("--batch", action="store_true", help="выполнять запросы пакетом")
+    parser.add_argument("--output", default="retrieval_benchmark.json", help="файл для сохранения результата")
+    parser.add_argument("--baseline", default=None, help="файл с результатом для сравнения")
+    args = parser.parse_args()
+
+    result = run_benchmark(
+        backend=args.backend,
+        sample=args.sample,
+        k=args.k,
+        seed=args.seed,
+        score_threshold=args.score_threshold,
+        rerank=not args.no_rerank,
+        batch=args.batch,
+    )
+
+    baseline = None
+    if args.baseline and os.path.exists(args.baseline):
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+    print_report(result, baseline)
+
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(result, f, ensure_ascii=False, indent=4)
+    print(f"\nРезультат сохранён в {args.output}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+"""
+Модуль для кеширования подсчёта токенов и офлайн-оценки их количества
+"""
+
+from typing import Dict, Optional
+from ..utils.config import load_config, resolve_project_path
+import hashlib
+import json
+import os
+import threading
+
+class TokenCache:
+    """
+    Кеш количества токенов по хешу содержимого.
+    Накопленные соотношения символов и токенов используются для офлайн-оценки без вызовов SDK.
+    """
+
+    def __init__(self, path: Optional[str] = None):
+        self.path = path or resolve_project_path(load_config()["chunking"]["token_cache_path"])
+        self.entries: Dict[str, dict] = {}
+        self.lock = threading.Lock()
+        self.load()
+
+    @staticmethod
+    def key(text: str) -> str:
+        """Ключ кеша - хеш содержимого"""
+        return hashlib.sha256(text.encode()).hexdigest()
+
+    def load(self):
+        """Загрузка кеша с диска"""
+        if os.path.exists(self.path):
+            with open(self.path, "r", encoding="utf-8") as f:
+                self.entries = json.load(f)
+
+    def save(self):
+        """Атомарное сохранение кеша на диск"""
+        with self.lock:
+            tmp_path = f"{self.path}.tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(self.entries, f, ensure_ascii=False, indent=1)
+            os.replace(tmp_path, self.path)
+
+    def get(self, text: str) -> Optional[int]:
+        """Количество токенов из кеша или None"""
+        entry = self.entries.get(self.key(text))
+        return entry["tokens"] if entry else None
+
+    def put(self, text: str, tokens: int, category: str = ""):
+        """Сохранение результата токенизации"""
+        with self.lock:
+            self.entries[self.key(text)] = {
+                "tokens": tokens,
+                "chars": len(text),
+                "category": category,
+            }
+
+    def chars_per_token(self, category: Optional[str] = None) -> float:
+        """
+        Калиброванное соотношение символов и токенов по накопленным замерам
+
+        Если для категории нет замеров, используются все замеры,
+        а при пустом кеше - значение из конфигурации.
+        """
+        entries = list(self.entries.values())
+        if category:
+            entries = [entry for entry in entries if entry.get("category") == category] or entries
+        tokens = sum(entry["tokens"] for entry in entries)
+        if not tokens:
+            return load_config()["chunking"]["chars_per_token"]
+        return sum(entry["chars"] for entry in entries) / tokens
+
+    def estimate(self, text: str, category: Optional[str] = None) -> int:
+        """Офлайн-оценка количества токенов"""
+        cached = self.get(text)
+        if cached is not None:
+            return cached
+        return int(len(text) / self.chars_per_token(category)) + 1
+
+    def count(self, text: str, model=None, category: str = "") -> int:
+        """Точное количество токенов: из кеша или через model.tokenize, без модели - оценка"""
+        cached = self.get(text)
+        if cached is not None:
+            return cached
+        if model is None:
+            return self.estimate(text, category)
+        tokens = len(model.tokenize(text))
+        self.put(text, tokens, category)
+        return tokens
+
+_token_cache = None
+
+def get_token_cache() -> TokenCache:
+    """Общий для процесса кеш токенов (пересоздаётся, если путь в конфигурации изменился)"""
+    global _token_cache
+    path = resolve_project_path(load_config()["chunking"]["token_cache_path"])
+    if _token_cache is None or _token_cache.path != path:
+        _token_cache = TokenCache(path)
+    return _token_cache
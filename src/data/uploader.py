@@ -0,0 +1,150 @@
+"""
+Модуль для параллельной загрузки чанков в облако
+"""
+
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Iterator, List, Optional, Tuple
+from tqdm.auto import tqdm
+from ..utils.config import load_config
+import logging
+import random
+import time
+
+# Инициализация логгера
+logger = logging.getLogger(__name__)
+
+def upload_chunk(sdk, text: str, retries: int, backoff: float):
+    """Загрузка одного чанка с повторными попытками и экспоненциальной задержкой"""
+    config = load_config()["upload"]
+    for attempt in range(retries + 1):
+        try:
+            return sdk.files.upload_bytes(
+                text.encode(),
+                ttl_days=config["ttl_days"],
+                expiration_policy=config["expiration_policy"],
+                mime_type="text/markdown"
+            )
+        except Exception as e:
+            if attempt == retries:
+                raise
+            # Экспоненциальная задержка со случайной добавкой, чтобы потоки не повторяли запросы синхронно
+            delay = backoff * (2 ** attempt) * (1 + random.random() / 2)
+            logger.warning(f"Ошибка загрузки чанка (попытка {attempt + 1}/{retries + 1}): {e}. "
+                           f"Повтор через {delay:.1f} сек")
+            time.sleep(delay)
+
+def iter_uploads(
+    sdk,
+    chunks: List[str],
+    max_workers: Optional[int] = None,
+    retries: Optional[int] = None,
+    backoff: Optional[float] = None,
+    desc: str = "Загрузка чанков"
+) -> Iterator[Tuple[int, object]]:
+    """
+    Параллельная загрузка чанков в облако с выдачей файлов по мере готовности
+
+    Args:
+        sdk: Экземпляр SDK
+        chunks: Тексты чанков
+        max_workers: Максимальное число одновременных загрузок
+        retries: Число повторных попыток для каждого чанка
+        backoff: Базовая задержка между попытками в секундах
+        desc: Подпись для индикатора прогресса
+
+    Yields:
+        tuple: (номер чанка, загруженный файл) в порядке завершения загрузок
+    """
+    config = load_config()["upload"]
+    max_workers = max_workers or config["max_workers"]
+    retries = config["retries"] if retries is None else retries
+    backoff = config["backoff"] if backoff is None else backoff
+
+    if not chunks:
+        return
+
+    errors = []
+    start_time = time.time()
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = {
+            executor.submit(upload_chunk, sdk, text, retries, backoff): i
+            for i, text in enumerate(chunks)
+        }
+        with tqdm(total=len(chunks), desc=desc, unit="чанк") as progress:
+            for future in as_completed(futures):
+                i = futures[future]
+                progress.update(1)
+                try:
+                    file = future.result()
+                except Exception as e:
+                    logger.error(f"Не удалось загрузить чанк {i}: {e}")
+                    errors.append((i, e))
+                    continue
+                yield i, file
+
+    elapsed = time.time() - start_time
+    uploaded = len(chunks) - len(errors)
+    print(f"{desc}: {uploaded}/{len(chunks)} чанков за {elapsed:.2f} сек "
+          f"({uploaded / max(elapsed, 1e-9):.1f} чанков/сек, потоков: {max_workers})")
+
+    if errors:
+        raise RuntimeError(f"Не удалось загрузить {len(errors)} из {len(chunks)} чанков")
+
+def upload_chunks(
+    sdk,
+    chunks: List[str],
+    max_workers: Optional[int] = None,
+    retries: Optional[int] = None,
+    backoff: Optional[float] = None,
+    desc: str = "Загрузка чанков"
+) -> list:
+    """
+    Параллельная загрузка чанков в облако
+
+    Returns:
+        list: Загруженные файлы в порядке исходных чанков
+    """
+    files = [None] * len(chunks)
+    for i, file in iter_uploads(sdk, chunks, max_workers, retries, backoff, desc):
+        files[i] = file
+    return files
+
+def extend_file_ttl(sdk, file_id: str):
+    """Продление TTL загруженного файла; возвращает новое время истечения"""
+    config = load_config()["upload"]
+    file = sdk.files.get(file_id).update(
+        ttl_days=config["ttl_days"],
+        expiration_policy=config["expiration_policy"]
+    )
+    expires_at = getattr(file, "expires_at", None)
+    # Облако возвращает время с часовым поясом, манифест хранит локальное время
+    if expires_at is not None and expires_at.tzinfo is not None:
+        expires_at = expires_at.astimezone().replace(tzinfo=None)
+    return expires_at
+
+def extend_file_ttls(sdk, file_ids: List[str], max_workers: Optional[int] = None) -> dict:
+    """
+    Параллельное продление TTL файлов вместо их повторной загрузки
+
+    Returns:
+        dict: ID файла -> новое время истечения (None, если файл уже удалён облаком
+            или продлить не удалось)
+    """
+    max_workers = max_workers or load_config()["upload"]["max_workers"]
+    results = {}
+    if not file_ids:
+        return results
+    start_time = time.time()
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = {executor.submit(extend_file_ttl, sdk, file_id): file_id for file_id in file_ids}
+        for future in as_completed(futures):
+            file_id = futures[future]
+            try:
+                results[file_id] = future.result()
+            except Exception as e:
+                logger.warning(f"Не удалось продлить TTL файла {file_id}: {e}")
+                results[file_id] = None
+    extended = sum(1 for expires_at in results.values() if expires_at is not None)
+    print(f"TTL продлён для {extended}/{len(file_ids)} файлов за {time.time() - start_time:.2f} сек")
+    return results
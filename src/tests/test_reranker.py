@@ -0,0 +1,102 @@
+"""
+Скрипт для проверки переранжирования результатов поиска на наборе случаев
+"""
+
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from ..core.reranker import rerank, get_source_type, get_year, get_staff_share
+
+# Параметры, не зависящие от переменных окружения
+CONFIG = {
+    "source_boosts": {"docs": 0.2, "facts": 0.0, "chats": 0.0},
+    "recency_boost": 0.15,
+    "recency_decay": 0.7,
+    "reference_year": 0,
+    "staff_boost": 0.1,
+    "staff_pattern": r"МАИ|[Пп]ри[её]мн|Институт",
+}
+
+def chat(year: int, author: str, score: float, label: str) -> dict:
+    """Результат поиска по архиву чата"""
+    text = f"Год: {year}\nТема: Другое\n\nВопрос (**ID 1** (Абитуриент, 01.07.{year}, 10:00:00)):\nВопрос\n\n" \
+           f"Ответ (**ID 2** ({author}, 01.07.{year}, 10:05:00)):\nОтвет"
+    return {"text": text, "score": score, "metadata": {}, "label": label}
+
+def doc(score: float, label: str) -> dict:
+    """Результат поиска по официальному документу"""
+    return {"text": "Ключевые слова: прием\nВопрос: Вопрос\nОтвет: Ответ", "score": score,
+            "metadata": {"source": "data/docs/pravila_priema.md"}, "label": label}
+
+def fact(score: float, label: str) -> dict:
+    """Результат поиска по фактам от студентов"""
+    return {"text": "Категория: Учебный процесс\nФакт: Факт", "score": score,
+            "metadata": {"source": "data/facts/Facts.md"}, "label": label}
+
+# Случаи: результаты в порядке близости и ожидаемый порядок после переранжирования
+CASES = [
+    (
+        "свежий ответ обгоняет устаревший при близкой оценке",
+        [chat(2021, "Студент", 0.80, "2021"), chat(2024, "Студент", 0.75, "2024")],
+        ["2024", "2021"],
+    ),
+    (
+        "документ обгоняет чат при близкой оценке",
+        [chat(2024, "Студент", 0.80, "chat"), doc(0.72, "doc")],
+        ["doc", "chat"],
+    ),
+    (
+        "ответ сотрудника обгоняет ответ студента того же года",
+        [chat(2023, "Студент", 0.80, "student"), chat(2023, "Институт №8 МАИ Чат", 0.78, "staff")],
+        ["staff", "student"],
+    ),
+    (
+        "бонусы не перевешивают большой разрыв в близости",
+        [chat(2021, "Студент", 0.90, "relevant"), doc(0.50, "doc"), chat(2024, "МАИ", 0.50, "fresh")],
+        ["relevant", "doc", "fresh"],
+    ),
+    (
+        "факты не получают бонуса относительно свежих чатов",
+        [fact(0.80, "fact"), chat(2024, "Студент", 0.78, "chat")],
+        ["chat", "fact"],
+    ),
+    (
+        "равные оценки сохраняют исходный порядок",
+        [fact(0.60, "first"), fact(0.60, "second")],
+        ["first", "second"],
+    ),
+]
+
+def check_helpers() -> list:
+    """Проверка разбора метаданных из текста чанка"""
+    errors = []
+    if get_source_type({"text": "Год: 2022\nТема: Другое"}) != "chats":
+        errors.append("тип источника чата по заголовку")
+    if get_source_type({"text": "", "metadata": {"source": "data/docs/celevoe.md"}}) != "docs":
+        errors.append("тип источника документа по метаданным")
+    if get_year({"text": "Год: 2022\nТема: Другое"}) != 2022:
+        errors.append("год по заголовку")
+    if get_year({"text": "", "metadata": {"year": "2023"}}) != 2023:
+        errors.append("год по метаданным")
+    if get_staff_share(chat(2024, "Институт №8 МАИ Чат", 1.0, "")["text"], CONFIG["staff_pattern"]) != 1.0:
+        errors.append("доля ответов сотрудников")
+    return errors
+
+def main() -> int:
+    failed = 0
+    for name, results, expected in CASES:
+        actual = [result["label"] for result in rerank(results, config=CONFIG)]
+        if actual != expected:
+            failed += 1
+        print(f"[{'OK' if actual == expected else 'FAIL'}] {name}: {actual}")
+
+    errors = check_helpers()
+    for error in errors:
+        print(f"[FAIL] {error}")
+
+    print(f"\nПройдено {len(CASES) - failed} из {len(CASES)} случаев, ошибок разбора: {len(errors)}")
+    return 1 if failed or errors else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -16,13 +16,134 @@ def load_config() -> Dict[str, Any]:
         },
         "assistant": {
             "ttl_days": 1,
-            "expiration_policy": "since_last_active"
+            "expiration_policy": "since_last_active",
+            "pool_size": int(os.getenv("ASSISTANT_POOL_SIZE", "1")),
+            "refresh_before_seconds": float(os.getenv("ASSISTANT_REFRESH_BEFORE", "3600")),
+            "retire_grace_seconds": float(os.getenv("ASSISTANT_RETIRE_GRACE", "300")),
+            "thread_mode": os.getenv("ASSISTANT_THREAD_MODE", "session"),
+            "max_thread_turns": int(os.getenv("ASSISTANT_MAX_THREAD_TURNS", "10")),
+            "max_thread_tokens": int(os.getenv("ASSISTANT_MAX_THREAD_TOKENS", "6000")),
+            "thread_delete_batch": int(os.getenv("ASSISTANT_THREAD_DELETE_BATCH", "20")),
+            "request_timeout": float(os.getenv("ASSISTANT_TIMEOUT", "60")),
+            "max_tool_rounds": int(os.getenv("ASSISTANT_MAX_TOOL_ROUNDS", "3")),
+            # Пауза, после которой вопрос пользователя считается началом нового диалога
+            "context_idle_seconds": float(os.getenv("ASSISTANT_CONTEXT_IDLE", "900"))
         },
         "search_index": {
-            "id": os.getenv("SEARCH_INDEX_ID", "")
+            "id": os.getenv("SEARCH_INDEX_ID", ""),
+            "manifest_path": os.getenv("CHUNK_MANIFEST_PATH", "chunk_manifest.json"),
+            "batch_size": int(os.getenv("INDEX_BATCH_SIZE", "100")),
+            "max_in_flight": int(os.getenv("INDEX_MAX_IN_FLIGHT", "4")),
+            "poll_interval": float(os.getenv("INDEX_POLL_INTERVAL", "1.0")),
+            "backend": os.getenv("SEARCH_BACKEND", "cloud"),
+            "batch_workers": int(os.getenv("SEARCH_BATCH_WORKERS", "8")),
+            # function - ассистент ищет через search_admissions_info (нормализация, бэкенд, переранжирование),
+            # index - встроенным инструментом облачного индекса
+            "assistant_tool": os.getenv("ASSISTANT_SEARCH_TOOL", "function"),
+            "tool_results": int(os.getenv("SEARCH_TOOL_RESULTS", "5"))
+        },
+        "index_registry": {
+            "path": os.getenv("INDEX_REGISTRY_PATH", "index_registry.json"),
+            "poll_interval": float(os.getenv("INDEX_REGISTRY_POLL_INTERVAL", "5")),
+            "keep": int(os.getenv("INDEX_REGISTRY_KEEP", "1")),
+            "warmup_queries": ["проходной балл", "общежитие", "документы для поступления"]
+        },
+        "local_search": {
+            "embedder": os.getenv("LOCAL_EMBEDDER", "hashing"),
+            "dim": int(os.getenv("LOCAL_EMBEDDING_DIM", "512")),
+            "rrf_k": int(os.getenv("LOCAL_RRF_K", "60")),
+            "bm25_k1": float(os.getenv("LOCAL_BM25_K1", "1.5")),
+            "bm25_b": float(os.getenv("LOCAL_BM25_B", "0.75")),
+            # Порог по шкале RRF (1.0 - первый в обоих списках, 0.5 - первый в одном);
+            # порог облачного поиска к этой шкале неприменим
+            "score_threshold": float(os.getenv("LOCAL_SCORE_THRESHOLD", "0.0")),
+            # Бонусы переранжирования в шкале RRF (подобрано по retrieval_benchmark)
+            "rerank_scale": float(os.getenv("LOCAL_RERANK_SCALE", "0.02"))
+        },
+        "query_normalizer": {
+            "enabled": os.getenv("QUERY_NORMALIZER_ENABLED", "1") == "1",
+            "max_edit_distance": int(os.getenv("QUERY_MAX_EDIT_DISTANCE", "2")),
+            "min_word_length": int(os.getenv("QUERY_MIN_WORD_LENGTH", "5")),
+            "min_frequency": int(os.getenv("QUERY_MIN_CANDIDATE_FREQUENCY", "1")),
+            "frequency_margin": float(os.getenv("QUERY_FREQUENCY_MARGIN", "2.0"))
+        },
+        "reranker": {
+            # Выключено по умолчанию: на retrieval_benchmark переранжирование пока не даёт выигрыша
+            "enabled": os.getenv("RERANK_ENABLED", "0") == "1",
+            "candidates_factor": int(os.getenv("RERANK_CANDIDATES_FACTOR", "2")),
+            "source_boosts": {
+                "docs": float(os.getenv("RERANK_DOCS_BOOST", "0.2")),
+                "facts": float(os.getenv("RERANK_FACTS_BOOST", "0.0")),
+                "chats": float(os.getenv("RERANK_CHATS_BOOST", "0.0"))
+            },
+            "recency_boost": float(os.getenv("RERANK_RECENCY_BOOST", "0.15")),
+            "recency_decay": float(os.getenv("RERANK_RECENCY_DECAY", "0.7")),
+            "reference_year": int(os.getenv("RERANK_REFERENCE_YEAR", "0")),
+            "staff_boost": float(os.getenv("RERANK_STAFF_BOOST", "0.1")),
+            "staff_pattern": os.getenv("RERANK_STAFF_PATTERN", r"МАИ|[Пп]ри[её]мн|Институт")
+        },
+        "embedding_store": {
+            "path": os.getenv("EMBEDDING_STORE_PATH", "embeddings"),
+            "dtype": os.getenv("EMBEDDING_STORE_DTYPE", "float32"),
+            "keep": int(os.getenv("EMBEDDING_STORE_KEEP", "2")),
+            "poll_interval": float(os.getenv("EMBEDDING_STORE_POLL_INTERVAL", "5"))
+        },
+        "search_cache": {
+            "enabled": os.getenv("SEARCH_CACHE_ENABLED", "1") == "1",
+            "max_size": int(os.getenv("SEARCH_CACHE_MAX_SIZE", "1024")),
+            "ttl_seconds": float(os.getenv("SEARCH_CACHE_TTL", "3600"))
+        },
+        "answer_cache": {
+            "enabled": os.getenv("ANSWER_CACHE_ENABLED", "1") == "1",
+            # yandex - близость по смыслу; hashing - по написанию, для кеша почти бесполезна:
+            # вопросы об институтах 3 и 8 у него ближе друг к другу, чем перефразировки
+            "embedder": os.getenv("ANSWER_CACHE_EMBEDDER", "yandex"),
+            "threshold": float(os.getenv("ANSWER_CACHE_THRESHOLD", "0.95")),
+            "max_size": int(os.getenv("ANSWER_CACHE_MAX_SIZE", "2000")),
+            "ttl_seconds": float(os.getenv("ANSWER_CACHE_TTL", "86400"))
+        },
+        "warmup": {
+            "enabled": os.getenv("STARTUP_WARMUP", "1") == "1"
+        },
+        "streaming": {
+            "enabled": os.getenv("STREAMING_ENABLED", "1") == "1",
+            "edit_interval": float(os.getenv("STREAMING_EDIT_INTERVAL", "1.0")),
+            "placeholder": os.getenv("STREAMING_PLACEHOLDER", "Готовлю ответ...")
+        },
+        "faq": {
+            "enabled": os.getenv("FAQ_ENABLED", "1") == "1",
+            "threshold": float(os.getenv("FAQ_THRESHOLD", "0.75")),
+            "margin": float(os.getenv("FAQ_MARGIN", "0.1"))
+        },
+        "chunking": {
+            "max_chunk_size_tokens": int(os.getenv("MAX_CHUNK_SIZE_TOKENS", "1000")),
+            "chunk_overlap_tokens": int(os.getenv("CHUNK_OVERLAP_TOKENS", "100")),
+            "chars_per_token": float(os.getenv("CHARS_PER_TOKEN", "2.0")),
+            "token_cache_path": os.getenv("TOKEN_CACHE_PATH", "token_cache.json")
+        },
+        "dedup": {
+            "enabled": os.getenv("DEDUP_ENABLED", "1") == "1",
+            "threshold": float(os.getenv("DEDUP_THRESHOLD", "0.6")),
+            "num_perm": int(os.getenv("DEDUP_NUM_PERM", "64")),
+            "bands": int(os.getenv("DEDUP_BANDS", "16")),
+            "min_words": int(os.getenv("DEDUP_MIN_WORDS", "3"))
+        },
+        "upload": {
+            "max_workers": int(os.getenv("UPLOAD_MAX_WORKERS", "8")),
+            "retries": int(os.getenv("UPLOAD_RETRIES", "3")),
+            "backoff": float(os.getenv("UPLOAD_BACKOFF", "1.0")),
+            "ttl_days": int(os.getenv("UPLOAD_TTL_DAYS", "1")),
+            "expiration_policy": "static"
         }
     }
 
+def resolve_project_path(path: str) -> str:
+    """Путь относительно корня проекта (абсолютные пути возвращаются без изменений)"""
+    if os.path.isabs(path):
+        return path
+    project_root = Path(__file__).resolve().parent.parent.parent
+    return str(project_root / path)
+
 def save_search_index_id(index_id: str):
     """Сохранение ID индекса в конфигурации"""
     env_path = Path(".env")
@@ -4,10 +4,10 @@
 
 import os
 from dotenv import load_dotenv
-from yandex_cloud_ml_sdk import YCloudML
+from yandex_cloud_ml_sdk import AsyncYCloudML, YCloudML
 
-def initialize_sdk():
-    """Инициализация SDK Yandex Cloud"""
+def get_credentials():
+    """Идентификатор каталога и API-ключ из окружения"""
     load_dotenv()
     
     folder_id = os.environ.get("folder_id")
@@ -16,4 +16,14 @@ def initialize_sdk():
     if not folder_id or not api_key:
         raise ValueError("Не найдены необходимые переменные окружения")
         
-    return YCloudML(folder_id=folder_id, auth=api_key) 
\ No newline at end of file
+    return folder_id, api_key
+
+def initialize_sdk():
+    """Инициализация SDK Yandex Cloud"""
+    folder_id, api_key = get_credentials()
+    return YCloudML(folder_id=folder_id, auth=api_key)
+
+def initialize_async_sdk():
+    """Инициализация асинхронного SDK Yandex Cloud"""
+    folder_id, api_key = get_credentials()
+    return AsyncYCloudML(folder_id=folder_id, auth=api_key)
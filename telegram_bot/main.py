@@ -1,5 +1,6 @@
 import telebot
 from telebot import types
+from telebot.util import smart_split
 import os
 from dotenv import load_dotenv
 import logging
@@ -7,12 +8,16 @@ import time
 import json
 import signal
 import sys
+import threading
 from src.core.utils import (
     save_user, update_user_role, get_all_admin_ids, stop_dialog,
     stay_in_quire, create_dialog, get_visavi, get_random_music
 )
 from src.core.assistant import AdmissionsAssistant
+from src.core.assistant_pool import get_assistant_pool
+from src.core.warmup import warm_up_services
 from src.core.sdk import set_bot, create_assistant
+from src.utils.config import load_config
 
 # Загрузка переменных окружения
 start_time = time.time()
@@ -60,7 +65,8 @@ if not BOT_TOKEN:
 # Инициализация бота и ассистента
 logger.info("Инициализация бота...")
 bot = telebot.TeleBot(BOT_TOKEN)
-assistants = {}  # Словарь для хранения ассистентов для каждого пользователя
+assistants = {}  # Словарь для хранения сессий пользователей (удалённый ассистент общий, из пула)
+assistants_lock = threading.Lock()
 calling_admin = dict()
 chat_history = {}  # Словарь для хранения истории чатов
 logger.info(f"Инициализация завершена: {time.time() - start_time:.2f} сек")
@@ -76,6 +82,7 @@ def signal_handler(signum, frame):
             assistant.cleanup()
         except Exception as e:
             logger.error(f"Ошибка при очистке ассистента: {e}")
+    get_assistant_pool().shutdown()
     sys.exit(0)
 
 # Регистрируем обработчики сигналов
@@ -84,10 +91,70 @@ signal.signal(signal.SIGTERM, signal_handler)
 
 def get_or_create_assistant(user_id):
     """Получение или создание ассистента для пользователя"""
-    if user_id not in assistants:
-        assistants[user_id] = AdmissionsAssistant()
-        assistants[user_id].start()
-    return assistants[user_id]
+    with assistants_lock:
+        if user_id not in assistants:
+            assistants[user_id] = AdmissionsAssistant(pool=get_assistant_pool(), user_id=user_id)
+            assistants[user_id].start()
+        return assistants[user_id]
+
+def send_long_message(chat_id, text):
+    """Отправка текста длиннее лимита Telegram несколькими сообщениями"""
+    for part in smart_split(text):
+        bot.send_message(chat_id, part)
+
+def stream_answer(chat_id, assistant, question):
+    """
+    Ответ ассистента с показом текста по мере генерации
+
+    Пользователь сразу получает сообщение-заглушку, которое обновляется
+    через edit_message_text не чаще раза в STREAMING_EDIT_INTERVAL секунд,
+    чтобы не упираться в ограничения Telegram на частоту правок. В заглушке
+    показывается первая часть ответа, а текст сверх лимита длины сообщения
+    отправляется следующими сообщениями после окончания генерации.
+
+    Returns:
+        tuple: (итоговый ответ ассистента, показан ли текстовый ответ пользователю)
+    """
+    config = load_config()["streaming"]
+    if not config["enabled"]:
+        return assistant.ask(question), False
+
+    placeholder = bot.send_message(chat_id, config["placeholder"])
+    shown = config["placeholder"]
+    last_edit = time.monotonic()
+
+    def show(text):
+        nonlocal shown, last_edit
+        try:
+            bot.edit_message_text(text, chat_id, placeholder.message_id)
+            shown = text
+        except Exception as e:
+            logger.warning(f"Не удалось обновить сообщение для пользователя {chat_id}: {e}")
+        last_edit = time.monotonic()
+        return shown == text
+
+    response = None
+    for response in assistant.ask_stream(question):
+        if isinstance(response, str) and response.strip() \
+                and time.monotonic() - last_edit >= config["edit_interval"]:
+            head = smart_split(response)[0]
+            if head != shown:
+                show(head)
+
+    # Итоговый ответ показываем сразу, без ожидания интервала
+    if isinstance(response, str) and response.strip():
+        parts = smart_split(response)
+        if parts[0] != shown and not show(parts[0]):
+            send_long_message(chat_id, response)
+        else:
+            for part in parts[1:]:
+                bot.send_message(chat_id, part)
+        return response, True
+    try:
+        bot.delete_message(chat_id, placeholder.message_id)
+    except Exception as e:
+        logger.warning(f"Не удалось удалить сообщение-заглушку для пользователя {chat_id}: {e}")
+    return response, False
 
 def cleanup_assistant(user_id):
     """Очистка ресурсов ассистента"""
@@ -178,7 +245,7 @@ def message_reply(message):
     # Обработка обычных сообщений через ассистента
     try:
         assistant = get_or_create_assistant(message.chat.id)
-        response = assistant.ask(message.text)
+        response, delivered = stream_answer(message.chat.id, assistant, message.text)
         
         # Сохраняем сообщение и ответ в историю
         if message.chat.id not in chat_history:
@@ -242,9 +309,11 @@ def message_reply(message):
                 cleanup_assistant(message.chat.id)
                 return
                 
+        elif delivered:
+            logger.info(f"Assistant response to user {message.chat.id} (streamed): {response}")
         elif response and response.strip():
             logger.info(f"Assistant response to user {message.chat.id}: {response}")
-            bot.send_message(message.chat.id, response)
+            send_long_message(message.chat.id, response)
         else:
             logger.info(f"Empty response from assistant for user {message.chat.id}, sent default message")
             bot.send_message(message.chat.id, "Извините, я не смог обработать ваш запрос. Попробуйте переформулировать вопрос.")
@@ -313,6 +382,13 @@ def handle_confirmation(call):
 
 if __name__ == "__main__":
     logger.info("Запуск бота...")
+    # Общие ресурсы создаются до приёма сообщений, чтобы первый ответ не ждал их создания
+    if load_config()["warmup"]["enabled"]:
+        report = warm_up_services()
+        failed = [name for name, item in report.items() if not item["ok"]]
+        if failed:
+            logger.warning(f"Не прогреты: {', '.join(failed)}; они будут созданы при первом запросе")
+    logger.info(f"Бот готов к работе: {time.time() - start_time:.2f} сек с начала загрузки")
     try:
         bot.infinity_polling()
     except KeyboardInterrupt:
@@ -325,4 +401,5 @@ if __name__ == "__main__":
             try:
                 assistant.cleanup()
             except Exception as e:
-                logger.error(f"Ошибка при очистке ассистента: {e}")
\ No newline at end of file
+                logger.error(f"Ошибка при очистке ассистента: {e}")
+        get_assistant_pool().shutdown()
\ No newline at end of file